@@ -0,0 +1,10 @@
+"""
+Shared Rich console for DeepShell.
+
+All modules print through this single instance, so terminal
+capabilities are detected once per process.
+"""
+
+from rich.console import Console
+
+console = Console()
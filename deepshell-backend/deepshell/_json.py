@@ -0,0 +1,31 @@
+"""
+Shared JSON helpers for DeepShell.
+
+All JSON reading and writing goes through orjson, which works in
+bytes; these wrappers keep its options in one place.
+"""
+
+from typing import Any, Callable, Optional, Union
+
+import orjson
+
+
+def dumps(value: Any, indent: bool = False,
+          default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize a value to JSON bytes.
+
+    Args:
+        value: Value to serialize
+        indent: Pretty-print with two-space indentation
+        default: Fallback for types orjson cannot serialize
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    return orjson.dumps(value, default=default,
+                        option=orjson.OPT_INDENT_2 if indent else None)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document."""
+    return orjson.loads(data)
@@ -6,30 +6,163 @@ Provides decorator-based caching with configurable size limits and
 automatic cleanup for improved performance and reduced API costs.
 """
 
+import atexit
 import hashlib
+import inspect
 import json
 import os
+import sqlite3
+import threading
 import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from functools import wraps
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional, TypeVar, Union
+from typing import Any, Callable, Dict, FrozenSet, Optional, TypeVar, Union
 
-from rich.console import Console
+import orjson
 
+from ._console import console
+from ._json import dumps, loads
 from .config import config
 
-console = Console()
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - falls back to zlib
+    zstandard = None
+
 
 F = TypeVar('F', bound=Callable[..., Any])
 
+# Bumped whenever the key derivation changes, invalidating old entries
+_KEY_VERSION = b'v5'
+
+
+# Cached results carry a one-byte tag: plain strings are stored verbatim,
+# anything else as JSON. Untagged entries are legacy JSON.
+_TAG_STR = b'S'
+_TAG_JSON = b'J'
+
+
+def _encode_result(result: Any) -> bytes:
+    """Serialize a function result for caching."""
+    if isinstance(result, str):
+        return _TAG_STR + result.encode('utf-8')
+    return _TAG_JSON + dumps(result, default=str)
+
+
+def _decode_result(data: bytes) -> Any:
+    """Deserialize a cached function result."""
+    tag = data[:1]
+    if tag == _TAG_STR:
+        return data[1:].decode('utf-8')
+    if tag == _TAG_JSON:
+        return loads(data[1:])
+    return loads(data)
+
+
+# Stored payloads are prefixed with a magic header naming the codec.
+# Entries without a known header (small or legacy) are returned as-is.
+_ZSTD_MAGIC = b'ZST1'
+_ZLIB_MAGIC = b'ZLB1'
+_COMPRESS_MIN_SIZE = 128
+
+# zstd (de)compressors are not thread-safe, so keep one per thread
+_codecs = threading.local()
 
-class Cache:
+# Page cache hint for large cache files (Linux and other POSIX systems)
+_FADVISE = hasattr(os, "posix_fadvise")
+_FADVISE_MIN_SIZE = 1024 * 1024
+
+# Raised when a stored payload fails to decompress
+_CODEC_ERRORS = (ValueError, zlib.error) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+def _compress(data: bytes) -> bytes:
+    """Compress a payload for storage."""
+    if len(data) < _COMPRESS_MIN_SIZE:
+        return data
+    if zstandard is not None:
+        compressor = getattr(_codecs, "compressor", None)
+        if compressor is None:
+            compressor = _codecs.compressor = zstandard.ZstdCompressor(level=3)
+        return _ZSTD_MAGIC + compressor.compress(data)
+    return _ZLIB_MAGIC + zlib.compress(data, 6)
+
+
+def _decompress(data: bytes) -> bytes:
+    """Decompress a stored payload."""
+    magic = data[:4]
+    if magic == _ZSTD_MAGIC:
+        if zstandard is None:
+            raise ValueError("zstandard is required to read this cache entry")
+        decompressor = getattr(_codecs, "decompressor", None)
+        if decompressor is None:
+            decompressor = _codecs.decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(data[4:])
+    if magic == _ZLIB_MAGIC:
+        return zlib.decompress(data[4:])
+    return data
+
+
+def _feed(h: Any, value: Any) -> None:
     """
-    File-based cache with LRU eviction and size management.
+    Feed a value into a hash without serializing it first.
     
-    Stores cached responses as individual files with MD5 hash keys
-    and maintains access times for LRU cleanup.
+    Each value is tagged with its type and strings carry their length,
+    so different structures never produce the same byte stream.
     """
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        h.update(b's%d:' % len(data))
+        h.update(data)
+    elif isinstance(value, (bytes, bytearray)):
+        h.update(b'b%d:' % len(value))
+        h.update(value)
+    elif isinstance(value, dict):
+        h.update(b'{')
+        for k in sorted(value, key=str):
+            _feed(h, k)
+            _feed(h, value[k])
+        h.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for item in value:
+            _feed(h, item)
+        h.update(b']')
+    else:
+        data = repr(value).encode('utf-8')
+        h.update(b'r%d:' % len(data))
+        h.update(data)
+
+
+def _make_key(*args, **kwargs) -> str:
+    """
+    Generate a cache key from function arguments.
+    
+    JSON-compatible arguments (message lists, numbers, strings) are
+    serialized in one orjson call with sorted keys; anything else is
+    walked with _feed.
+    """
+    h = hashlib.blake2b(_KEY_VERSION, digest_size=16)
+    try:
+        h.update(orjson.dumps(
+            (args, kwargs),
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        ))
+        return h.hexdigest()
+    except TypeError:
+        pass
+    _feed(h, args)
+    _feed(h, kwargs)
+    return h.hexdigest()
+
+
+class BaseCache(ABC):
+    """Abstract base class for cache backends."""
     
     def __init__(self, max_size: int, cache_dir: Union[str, Path]) -> None:
         """
@@ -37,112 +170,302 @@ class Cache:
         
         Args:
             max_size: Maximum number of cached items
-            cache_dir: Directory to store cache files
+            cache_dir: Directory to store cache data
         """
         self.max_size = max_size
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _generate_key(self, *args, **kwargs) -> str:
+        """Generate cache key from function arguments."""
+        return _make_key(*args, **kwargs)
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Get cached value by key."""
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: Union[bytes, str]) -> None:
+        """Set cached value for key."""
+        pass
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """Clear all cached entries."""
+        pass
+    
+    @abstractmethod
+    def size(self) -> int:
+        """Get current cache size."""
+        pass
+    
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        pass
+
+
+class SQLiteCache(BaseCache):
+    """
+    SQLite-backed cache with LRU eviction and size management.
+    
+    Stores all entries in a single WAL-mode database, so hits and
+    evictions do not touch the filesystem per entry.
+    """
+    
+    def __init__(self, max_size: int, cache_dir: Union[str, Path]) -> None:
+        """
+        Initialize cache.
+        
+        Args:
+            max_size: Maximum number of cached items
+            cache_dir: Directory to store the cache database
+        """
+        super().__init__(max_size, cache_dir)
+        
+        self.db_file = self.cache_dir / "cache.db"
+        # Autocommit mode; the cache may be shared across server threads
+        self.db = sqlite3.connect(
+            str(self.db_file), isolation_level=None, check_same_thread=False
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS kv "
+            "(key TEXT PRIMARY KEY, atime REAL NOT NULL, value BLOB NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS kv_atime ON kv (atime)")
+    
+    def _cleanup_old_entries(self) -> None:
+        """Remove oldest entries if cache exceeds max size."""
+        items_to_remove = self.size() - self.max_size
+        if items_to_remove <= 0:
+            return
+        
+        self.db.execute(
+            "DELETE FROM kv WHERE key IN "
+            "(SELECT key FROM kv ORDER BY atime LIMIT ?)",
+            (items_to_remove,)
+        )
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Get cached value by key."""
+        try:
+            row = self.db.execute(
+                "SELECT value FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            # Update access time
+            self.db.execute(
+                "UPDATE kv SET atime = ? WHERE key = ?", (time.time(), key)
+            )
+            
+            return _decompress(row[0])
+        
+        except (sqlite3.Error,) + _CODEC_ERRORS as e:
+            console.print(f"[yellow]Warning: Could not read cache entry {key}: {e}[/yellow]")
+            return None
+    
+    def set(self, key: str, value: Union[bytes, str]) -> None:
+        """Set cached value for key."""
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        
+        try:
+            self.db.execute(
+                "INSERT OR REPLACE INTO kv (key, atime, value) VALUES (?, ?, ?)",
+                (key, time.time(), _compress(value))
+            )
+            self._cleanup_old_entries()
+        
+        except sqlite3.Error as e:
+            console.print(f"[yellow]Warning: Could not write cache entry {key}: {e}[/yellow]")
+    
+    def clear(self) -> None:
+        """Clear all cached entries."""
+        try:
+            self.db.execute("DELETE FROM kv")
+        except sqlite3.Error as e:
+            console.print(f"[yellow]Warning: Could not clear cache: {e}[/yellow]")
+    
+    def size(self) -> int:
+        """Get current cache size."""
+        return self.db.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        entries, total_size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM kv"
+        ).fetchone()
         
-        # Metadata file to track access times
+        return {
+            "entries": entries,
+            "max_entries": self.max_size,
+            "total_size_bytes": total_size,
+            "total_size_mb": round(total_size / (1024 * 1024), 2),
+            "cache_dir": str(self.cache_dir),
+        }
+
+
+class FileCache(BaseCache):
+    """
+    File-based cache with LRU eviction and size management.
+    
+    Stores cached responses as individual files with BLAKE2b hash keys
+    and maintains access times for LRU cleanup. Useful when cache
+    entries need to be inspected or edited by hand.
+    """
+    
+    def __init__(self, max_size: int, cache_dir: Union[str, Path]) -> None:
+        """
+        Initialize cache.
+        
+        Args:
+            max_size: Maximum number of cached items
+            cache_dir: Directory to store cache files
+        """
+        super().__init__(max_size, cache_dir)
+        
+        # Metadata file to track access times. Access times are loaded on
+        # first use, kept in memory and flushed every few mutations and at
+        # process exit.
         self.metadata_file = self.cache_dir / ".cache_metadata.json"
-        self.metadata = self._load_metadata()
+        self._cache_dir_str = str(self.cache_dir) + os.sep
+        self._metadata: Optional[Dict[str, float]] = None
+        self._dirty = 0
+        self._flush_every = 32
+        atexit.register(self._flush_metadata)
+    
+    @property
+    def metadata(self) -> Dict[str, float]:
+        """Access times by key, in LRU order (oldest first)."""
+        if self._metadata is None:
+            self._metadata = self._load_metadata()
+        return self._metadata
     
     def _load_metadata(self) -> Dict[str, float]:
         """Load cache metadata (access times)."""
         if self.metadata_file.exists():
             try:
                 with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    data = json.load(f)
+                # Keep entries in LRU order (oldest first)
+                return OrderedDict(sorted(data.items(), key=lambda x: x[1]))
             except (json.JSONDecodeError, IOError):
                 pass
-        return {}
+        return OrderedDict()
     
     def _save_metadata(self) -> None:
-        """Save cache metadata to disk."""
+        """Save cache metadata to disk atomically."""
+        tmp_file = self.metadata_file.with_suffix(".tmp")
         try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f)
+            data = json.dumps(self.metadata, separators=(',', ':')).encode('utf-8')
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, self.metadata_file)
+            self._dirty = 0
         except IOError as e:
             console.print(f"[yellow]Warning: Could not save cache metadata: {e}[/yellow]")
+
+    def _flush_metadata(self) -> None:
+        """Save cache metadata if it has unsaved changes."""
+        if self._dirty:
+            self._save_metadata()
+
+    def _touch(self, key: str) -> None:
+        """Record access time for key, flushing metadata every few updates."""
+        self.metadata[key] = time.time()
+        self.metadata.move_to_end(key)
+        self._dirty += 1
+        if self._dirty >= self._flush_every:
+            self._save_metadata()
     
-    def _generate_key(self, *args, **kwargs) -> str:
-        """Generate cache key from function arguments."""
-        # Create a stable string representation
-        key_data = {
-            'args': args,
-            'kwargs': sorted(kwargs.items())
-        }
-        key_string = json.dumps(key_data, sort_keys=True, default=str)
-        return hashlib.md5(key_string.encode('utf-8')).hexdigest()
-    
-    def _get_cache_file(self, key: str) -> Path:
+    def _get_cache_file(self, key: str) -> str:
         """Get cache file path for key."""
-        return self.cache_dir / f"{key}.cache"
+        return self._cache_dir_str + key + ".cache"
     
     def _cleanup_old_entries(self) -> None:
         """Remove oldest entries if cache exceeds max size."""
         if len(self.metadata) <= self.max_size:
             return
         
-        # Sort by access time (oldest first)
-        sorted_items = sorted(self.metadata.items(), key=lambda x: x[1])
-        items_to_remove = len(sorted_items) - self.max_size
+        # Metadata is kept in LRU order, so the oldest entries come first
+        items_to_remove = len(self.metadata) - self.max_size
         
-        for key, _ in sorted_items[:items_to_remove]:
-            cache_file = self._get_cache_file(key)
+        for _ in range(items_to_remove):
+            key, _ = self.metadata.popitem(last=False)
             try:
-                if cache_file.exists():
-                    cache_file.unlink()
-                del self.metadata[key]
-            except (OSError, KeyError) as e:
+                os.unlink(self._get_cache_file(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
                 console.print(f"[yellow]Warning: Could not remove cache entry {key}: {e}[/yellow]")
         
-        self._save_metadata()
+        # Evictions are written out with the next metadata flush
+        self._dirty += items_to_remove
     
-    def get(self, key: str) -> Optional[str]:
+    def get(self, key: str) -> Optional[bytes]:
         """Get cached value by key."""
         cache_file = self._get_cache_file(key)
         
-        if not cache_file.exists():
-            return None
-        
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
+            with open(cache_file, 'rb') as f:
                 content = f.read()
             
             # Update access time
-            self.metadata[key] = time.time()
-            self._save_metadata()
+            self._touch(key)
             
-            return content
+            return _decompress(content)
         
-        except (IOError, UnicodeDecodeError) as e:
+        except FileNotFoundError:
+            return None
+        except (IOError,) + _CODEC_ERRORS as e:
             console.print(f"[yellow]Warning: Could not read cache file {key}: {e}[/yellow]")
             return None
     
-    def set(self, key: str, value: str) -> None:
+    def set(self, key: str, value: Union[bytes, str]) -> None:
         """Set cached value for key."""
         cache_file = self._get_cache_file(key)
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        data = _compress(value)
         
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                f.write(value)
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+                if _FADVISE and len(data) >= _FADVISE_MIN_SIZE:
+                    # Large entries are rarely re-read soon; keep them out
+                    # of the page cache
+                    f.flush()
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+            os.replace(tmp_file, cache_file)
             
             # Update metadata
-            self.metadata[key] = time.time()
+            self._touch(key)
             self._cleanup_old_entries()
-            self._save_metadata()
         
         except IOError as e:
             console.print(f"[yellow]Warning: Could not write cache file {key}: {e}[/yellow]")
+            try:
+                os.unlink(tmp_file)
+            except OSError:
+                pass
     
     def clear(self) -> None:
         """Clear all cached entries."""
         try:
-            for cache_file in self.cache_dir.glob("*.cache"):
-                cache_file.unlink()
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(".cache"):
+                        os.unlink(entry.path)
             
-            self.metadata.clear()
+            self._metadata = OrderedDict()
             if self.metadata_file.exists():
                 self.metadata_file.unlink()
         
@@ -155,8 +478,11 @@ class Cache:
     
     def stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        cache_files = list(self.cache_dir.glob("*.cache"))
-        total_size = sum(f.stat().st_size for f in cache_files if f.exists())
+        total_size = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".cache"):
+                    total_size += entry.stat(follow_symlinks=False).st_size
         
         return {
             "entries": len(self.metadata),
@@ -167,16 +493,56 @@ class Cache:
         }
 
 
+def _cache_enabled() -> bool:
+    """Check whether response caching is enabled in configuration."""
+    # The value is a string by default but a bool once read from the
+    # config file or the environment
+    return config.get("ENABLE_CACHE") in (True, "true")
+
+
+# Resolved once at import; call reload() after changing ENABLE_CACHE
+_CACHE_ENABLED = _cache_enabled()
+
+# Available cache backends, selected with CACHE_BACKEND
+CACHE_BACKENDS = {
+    "sqlite": SQLiteCache,
+    "file": FileCache,
+}
+
 # Global cache instance
-_cache: Optional[Cache] = None
+_cache: Optional[BaseCache] = None
+
+# In-process LRU of decoded results in front of the persistent cache
+_HOT: "OrderedDict[str, Any]" = OrderedDict()
+_HOT_MAX = config.get("HOT_CACHE_LENGTH")
+
+
+def reload() -> None:
+    """Re-read cache settings from configuration."""
+    global _CACHE_ENABLED, _HOT_MAX
+    _CACHE_ENABLED = _cache_enabled()
+    _HOT_MAX = config.get("HOT_CACHE_LENGTH")
+    _HOT.clear()
+
 
+def _remember(key: str, value: Any) -> None:
+    """Store a decoded result in the in-process LRU."""
+    _HOT[key] = value
+    _HOT.move_to_end(key)
+    while len(_HOT) > _HOT_MAX:
+        _HOT.popitem(last=False)
 
-def get_cache() -> Cache:
+
+def get_cache() -> BaseCache:
     """Get or create global cache instance."""
     global _cache
     
     if _cache is None:
-        _cache = Cache(
+        backend = config.get("CACHE_BACKEND")
+        if backend not in CACHE_BACKENDS:
+            console.print(f"[yellow]Warning: Unknown cache backend '{backend}', using sqlite[/yellow]")
+            backend = "sqlite"
+        _cache = CACHE_BACKENDS[backend](
             max_size=config.get("CACHE_LENGTH"),
             cache_dir=config.get("CACHE_PATH")
         )
@@ -191,33 +557,46 @@ def cache_response(func: F) -> F:
     Only caches if caching is enabled in configuration.
     Skips caching for functions that use function calling.
     """
+    # Decide once whether the first positional argument is 'self'
+    params = inspect.signature(func).parameters
+    skip_self = bool(params) and next(iter(params)) == "self"
+    cache: Optional[BaseCache] = None
+    
     @wraps(func)
     def wrapper(*args, **kwargs):
-        # Skip caching if disabled
-        if config.get("ENABLE_CACHE") != "true":
-            return func(*args, **kwargs)
-        
-        # Skip caching if function calling is involved
-        if kwargs.get("functions") or kwargs.get("tools"):
-            return func(*args, **kwargs)
-        
-        # Skip caching for streaming responses
-        if kwargs.get("stream", False):
+        nonlocal cache
+        # Skip caching if disabled globally or per call, for streaming
+        # responses, and when function calling is involved
+        if (
+            not _CACHE_ENABLED
+            or kwargs.get("cache") is False
+            or kwargs.get("stream")
+            or kwargs.get("functions")
+            or kwargs.get("tools")
+        ):
             return func(*args, **kwargs)
         
-        cache = get_cache()
+        if cache is None:
+            cache = get_cache()
         
         # Generate cache key (skip 'self' parameter if present)
-        cache_args = args[1:] if args and hasattr(args[0], '__dict__') else args
-        cache_key = cache._generate_key(*cache_args, **kwargs)
+        cache_args = args[1:] if skip_self else args
+        cache_key = _make_key(*cache_args, **kwargs)
+        
+        # Repeated calls in this process skip the persistent cache
+        if cache_key in _HOT:
+            _HOT.move_to_end(cache_key)
+            return _HOT[cache_key]
         
         # Try to get from cache
         cached_result = cache.get(cache_key)
         if cached_result is not None:
             try:
                 # Deserialize cached result
-                return json.loads(cached_result)
-            except json.JSONDecodeError:
+                result = _decode_result(cached_result)
+                _remember(cache_key, result)
+                return result
+            except ValueError:
                 # If deserialization fails, treat as cache miss
                 pass
         
@@ -226,8 +605,9 @@ def cache_response(func: F) -> F:
         
         # Cache the result
         try:
-            serialized_result = json.dumps(result, default=str)
+            serialized_result = _encode_result(result)
             cache.set(cache_key, serialized_result)
+            _remember(cache_key, result)
         except (TypeError, ValueError) as e:
             console.print(f"[yellow]Warning: Could not cache result: {e}[/yellow]")
         
@@ -236,10 +616,83 @@ def cache_response(func: F) -> F:
     return wrapper
 
 
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a message, including structured (cache-marked) content."""
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def cache_completion(response_type: type, forwarded: FrozenSet[str]) -> Callable[[F], F]:
+    """
+    Decorator to cache non-streaming chat completions by their text.
+    
+    Entries are keyed by the model, the messages reduced to role and text
+    (so prompt-cache markers don't change the key), the sampling
+    parameters and any other keyword arguments forwarded to the provider.
+    A hit is returned as response_type(content) without touching the
+    network. Sampled (temperature > 0) and streaming calls, function
+    calling and responses that are already response_type instances
+    (errors, cache hits) bypass the cache.
+    
+    Args:
+        response_type: Response class built from cached content
+        forwarded: Keyword arguments the client passes on to the provider
+    """
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(self, messages, model=None, temperature=0.0, top_p=1.0,
+                    max_tokens=None, stream=False, functions=None, **kwargs):
+            if (
+                not _CACHE_ENABLED
+                or kwargs.get("cache") is False
+                or temperature > 0
+                or stream
+                or functions
+                or kwargs.get("tools")
+            ):
+                return func(self, messages, model, temperature, top_p,
+                            max_tokens, stream, functions, **kwargs)
+            
+            cache_key = _make_key(
+                "completion",
+                model or self.get_default_model(),
+                [(m.get("role"), _message_text(m)) for m in messages],
+                temperature,
+                top_p,
+                max_tokens,
+                sorted((k, v) for k, v in kwargs.items() if k in forwarded),
+            )
+            cache = get_cache()
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                try:
+                    return response_type(_decode_result(cached_result))
+                except ValueError:
+                    pass
+            
+            response = func(self, messages, model, temperature, top_p,
+                            max_tokens, stream, functions, **kwargs)
+            if not isinstance(response, response_type):
+                try:
+                    content = response.choices[0].message.content
+                except (AttributeError, IndexError):
+                    content = None
+                if isinstance(content, str):
+                    cache.set(cache_key, _encode_result(content))
+            return response
+        
+        return wrapper
+    
+    return decorator
+
+
 def clear_cache() -> None:
     """Clear all cached responses."""
     cache = get_cache()
     cache.clear()
+    _HOT.clear()
     console.print("[green]✓ Cache cleared successfully[/green]")
 
 
@@ -6,21 +6,12 @@ user interactions and routing to appropriate handlers.
 """
 
 import sys
+from functools import lru_cache
 from typing import Optional
 
 import typer
-from rich.console import Console
 
 from .config import config
-from .handlers.chat_handler import ChatHandler
-from .handlers.default_handler import DefaultHandler
-from .handlers.repl_handler import ReplHandler
-from .persona import get_persona, list_personas, create_persona, show_persona
-from .utils import (
-    get_edited_prompt,
-    install_shell_integration,
-    detect_stdin,
-)
 
 app = typer.Typer(
     name="deepshell",
@@ -29,7 +20,13 @@ app = typer.Typer(
     rich_markup_mode="rich",
 )
 
-console = Console()
+
+@lru_cache(maxsize=1)
+def _console():
+    """Get the shared console, importing Rich on first use."""
+    from ._console import console
+    return console
+
 
 @app.command()
 def main(
@@ -117,6 +114,21 @@ def main(
         "--editor",
         help="Use $EDITOR for prompt input.",
     ),
+    batch: Optional[str] = typer.Option(
+        None,
+        "--batch",
+        help="Submit prompts from a file (one per line) through the Batch API.",
+    ),
+    batch_output: Optional[str] = typer.Option(
+        None,
+        "--batch-output",
+        help="JSONL file to record --batch results in; completed prompts are skipped on rerun.",
+    ),
+    batch_api: bool = typer.Option(
+        True,
+        "--batch-api/--no-batch-api",
+        help="Send --batch prompts through the discounted Batch API, or run them right away, MAX_CONCURRENCY at a time.",
+    ),
     # chat: Optional[str] = typer.Option(
     #     None,
     #     "--chat",
@@ -184,24 +196,28 @@ def main(
     # Handle version flag
     if version:
         from . import __version__
-        console.print(f"DeepShell version {__version__}")
+        _console().print(f"DeepShell version {__version__}")
         return
 
     # Handle installation
     if install_integration:
+        from .utils import install_shell_integration
         install_shell_integration()
         return
 
     # Handle persona management
     if create_persona_name:
+        from .persona import create_persona
         create_persona(create_persona_name)
         return
 
     if show_persona_name:
+        from .persona import show_persona
         show_persona(show_persona_name)
         return
 
     if list_personas_flag:
+        from .persona import list_personas
         list_personas()
         return
 
@@ -216,7 +232,7 @@ def main(
 
     # Validate provider (only openai supported)
     if provider != "openai":
-        console.print("[red]Error: Only 'openai' provider is supported.[/red]")
+        _console().print("[red]Error: Only 'openai' provider is supported.[/red]")
         raise typer.Exit(1)
 
     # Determine model - if not specified, use default
@@ -226,13 +242,15 @@ def main(
     # Validate mutually exclusive options
     mode_options = [shell, describe_shell, code]
     if sum(mode_options) > 1:
-        console.print("[red]Error: --shell, --describe-shell, and --code are mutually exclusive[/red]")
+        _console().print("[red]Error: --shell, --describe-shell, and --code are mutually exclusive[/red]")
         raise typer.Exit(1)
 
+    from .utils import detect_stdin, get_edited_prompt, read_stdin
+
     # Handle input sources
     stdin_content = ""
     if detect_stdin():
-        stdin_content = sys.stdin.read().strip()
+        stdin_content = read_stdin()
 
     if editor and not prompt and not stdin_content:
         prompt = get_edited_prompt()
@@ -246,10 +264,12 @@ def main(
     else:
         full_prompt = prompt
 
-    if not full_prompt and not False:  # repl is commented out
-        console.print("[red]Error: No prompt provided. Use --help for usage information.[/red]")
+    if not full_prompt and not batch:  # repl is commented out
+        _console().print("[red]Error: No prompt provided. Use --help for usage information.[/red]")
         raise typer.Exit(1)
 
+    from .persona import get_persona
+
     # Determine persona
     if shell:
         persona_obj = get_persona("shell")
@@ -283,14 +303,32 @@ def main(
         #     handler = ChatHandler(chat, persona_obj, markdown)
         #     handler.handle(full_prompt, **handler_options)
         # else:
+        from .handlers.default_handler import DefaultHandler
         handler = DefaultHandler(persona_obj, markdown)
-        handler.handle(full_prompt, **handler_options)
+        if batch:
+            import asyncio
+
+            with open(batch, "r", encoding="utf-8") as f:
+                prompts = [line.strip() for line in f if line.strip()]
+            if batch_api:
+                results = asyncio.run(handler.handle_many(prompts, output_path=batch_output, **handler_options))
+            else:
+                if batch_output:
+                    _console().print("[yellow]Warning: --batch-output is only used with the Batch API[/yellow]")
+                results = asyncio.run(handler.handle_batch(prompts, **handler_options))
+            ok = all(result is not None for result in results)
+        else:
+            ok = handler.handle(full_prompt, **handler_options)
 
     except KeyboardInterrupt:
-        console.print("\n[yellow]Operation cancelled by user.[/yellow]")
+        _console().print("\n[yellow]Operation cancelled by user.[/yellow]")
         raise typer.Exit(130)
     except Exception as e:
-        console.print(f"[red]Error: {str(e)}[/red]")
+        _console().print(f"[red]Error: {str(e)}[/red]")
+        raise typer.Exit(1)
+
+    # Failures are printed, but callers such as scripts need the exit code
+    if not ok:
         raise typer.Exit(1)
 
 
@@ -7,15 +7,16 @@ Supports OpenAI LLM provider only.
 """
 
 import os
+import sys
 from getpass import getpass
 from pathlib import Path
 from tempfile import gettempdir
 from typing import Any, Dict
 
-from rich.console import Console
 from rich.prompt import Prompt
 
-console = Console()
+from ._console import console
+
 
 # Configuration paths
 CONFIG_FOLDER = os.path.expanduser("~/.config")
@@ -25,6 +26,7 @@ PERSONA_STORAGE_PATH = DEEPSHELL_CONFIG_FOLDER / "personas"
 FUNCTIONS_PATH = DEEPSHELL_CONFIG_FOLDER / "functions"
 CHAT_CACHE_PATH = Path(gettempdir()) / "deepshell_chat_cache"
 CACHE_PATH = Path(gettempdir()) / "deepshell_cache"
+REPL_HISTORY_PATH = Path(os.path.expanduser("~/.cache")) / "deepshell" / "history"
 
 # Default configuration
 DEFAULT_CONFIG = {
@@ -39,13 +41,17 @@ DEFAULT_CONFIG = {
     "API_BASE_URL": os.getenv("API_BASE_URL", ""),
     "USE_LITELLM": os.getenv("USE_LITELLM", "true"),
     "REQUEST_TIMEOUT": int(os.getenv("REQUEST_TIMEOUT", "60")),
+    "PROMPT_CACHE": os.getenv("PROMPT_CACHE", "true"),
 
     # Cache Configuration
     "CHAT_CACHE_PATH": os.getenv("CHAT_CACHE_PATH", str(CHAT_CACHE_PATH)),
     "CACHE_PATH": os.getenv("CACHE_PATH", str(CACHE_PATH)),
     "CHAT_CACHE_LENGTH": int(os.getenv("CHAT_CACHE_LENGTH", "100")),
     "CACHE_LENGTH": int(os.getenv("CACHE_LENGTH", "100")),
+    "HOT_CACHE_LENGTH": int(os.getenv("HOT_CACHE_LENGTH", "64")),
     "ENABLE_CACHE": os.getenv("ENABLE_CACHE", "true"),
+    "CACHE_BACKEND": os.getenv("CACHE_BACKEND", "sqlite"),
+    "REPL_HISTORY_PATH": os.getenv("REPL_HISTORY_PATH", str(REPL_HISTORY_PATH)),
 
     # Display Configuration
     "PRETTIFY_MARKDOWN": os.getenv("PRETTIFY_MARKDOWN", "true"),
@@ -71,9 +77,17 @@ DEFAULT_CONFIG = {
     # Advanced Configuration
     "MAX_RETRIES": int(os.getenv("MAX_RETRIES", "3")),
     "RETRY_DELAY": float(os.getenv("RETRY_DELAY", "1.0")),
+    "MAX_CONCURRENCY": int(os.getenv("MAX_CONCURRENCY", "5")),
     "LOG_LEVEL": os.getenv("LOG_LEVEL", "INFO"),
 }
 
+# Config file values are coerced to the type of their default
+_TYPES = {key: type(value) for key, value in DEFAULT_CONFIG.items()}
+_COERCE = {
+    int: int,
+    float: float,
+}
+
 
 class Config(dict):
     """Configuration manager with file persistence and environment override."""
@@ -82,6 +96,9 @@ class Config(dict):
         super().__init__()
         self.config_path = config_path
 
+        # Resolved values from get(), invalidated whenever a key is set
+        self._resolved: Dict[str, Any] = {}
+
         # Load configuration with priority: env vars > config file > defaults
         self.update(defaults)
 
@@ -99,8 +116,12 @@ class Config(dict):
             # Create config directory and file
             config_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # Prompt for API key if not in environment
+            # Prompt for API key if not in environment. Without a terminal
+            # there is nobody to ask; leave the file unwritten so the next
+            # interactive run prompts instead
             if not self.get("OPENAI_API_KEY"):
+                if not sys.stdin.isatty():
+                    return
                 self._prompt_api_key()
 
             self._write()
@@ -113,25 +134,29 @@ class Config(dict):
     def _read(self) -> None:
         """Read configuration from file."""
         try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#") and "=" in line:
-                        key, value = line.split("=", 1)
-                        key = key.strip()
-                        value = value.strip().strip('"\'')
-
-                        # Convert to appropriate type
-                        if value.lower() in ("true", "false"):
-                            value = value.lower() == "true"
-                        elif value.isdigit():
-                            value = int(value)
-                        elif value.replace(".", "").isdigit():
-                            value = float(value)
-
-                        self[key] = value
+            text = self.config_path.read_text(encoding="utf-8")
         except Exception as e:
             console.print(f"[yellow]Warning: Could not read config file: {e}[/yellow]")
+            return
+
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line[0] == "#" or "=" not in line:
+                continue
+
+            key, value = line.split("=", 1)
+            key = key.strip()
+            value = value.strip().strip('"\'')
+
+            # Convert to the type of the default value
+            coerce = _COERCE.get(_TYPES.get(key, str))
+            if coerce is not None:
+                try:
+                    value = coerce(value)
+                except ValueError:
+                    pass
+
+            self[key] = value
 
     def _write(self) -> None:
         """Write configuration to file."""
@@ -164,22 +189,41 @@ class Config(dict):
         if not openai_key:
             console.print("[yellow]Warning: No API key provided. Set your API key in your environment or config file.[/yellow]")
 
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._resolved.pop(key, None)
+        super().__setitem__(key, value)
+
+    def clear(self) -> None:
+        self._resolved.clear()
+        super().clear()
+
     def get(self, key: str, default: Any = None) -> Any:
         """Get configuration value with environment variable override."""
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
         # Environment variables take precedence
         env_value = os.getenv(key)
         if env_value is not None:
             # Convert string environment variables to appropriate types
             if env_value.lower() in ("true", "false"):
-                return env_value.lower() == "true"
+                value = env_value.lower() == "true"
             elif env_value.isdigit():
-                return int(env_value)
+                value = int(env_value)
             elif env_value.replace(".", "").replace("-", "").isdigit():
-                return float(env_value)
-            return env_value
+                value = float(env_value)
+            else:
+                value = env_value
+        elif key in self:
+            # Fall back to config file or default
+            value = super().get(key)
+        else:
+            return default
 
-        # Fall back to config file or default
-        return super().get(key, default)
+        self._resolved[key] = value
+        return value
 
     def set(self, key: str, value: Any) -> None:
         """Set configuration value and persist to file."""
@@ -8,8 +8,21 @@ Handlers manage different interaction modes:
 - ReplHandler: Interactive REPL mode
 """
 
-from .default_handler import DefaultHandler
-from .chat_handler import ChatHandler
-from .repl_handler import ReplHandler
+from importlib import import_module
+
+# Handlers are imported on first access so that using one handler
+# does not pull in the dependencies of the others
+_HANDLER_MODULES = {
+    "DefaultHandler": ".default_handler",
+    "ChatHandler": ".chat_handler",
+    "ReplHandler": ".repl_handler",
+}
 
 __all__ = ["DefaultHandler", "ChatHandler", "ReplHandler"]
+
+
+def __getattr__(name: str):
+    module_name = _HANDLER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module_name, __name__), name)
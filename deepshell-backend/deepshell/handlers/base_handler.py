@@ -5,21 +5,90 @@ Provides common functionality for API communication, caching,
 function calling, and response processing.
 """
 
-import json
-from typing import Any, Dict, Generator, List, Optional, Union
-
-from rich.console import Console
+import asyncio
+import itertools
+import re
+import time
+import weakref
+from typing import Any, Dict, Generator, Iterator, List, Optional, Union
+
+from markdown_it import MarkdownIt
 from rich.live import Live
 from rich.markdown import Markdown
 from rich.syntax import Syntax
 from rich.text import Text
 
+from .._console import console
+from .._json import loads
 from ..cache import cache_response
 from ..config import config
 from ..llm import get_client
 from ..persona import Persona
 
-console = Console()
+# Common error causes as (keyword, title, advice...), checked in order
+_ERROR_MESSAGES = (
+    (
+        "api key",
+        "API Key Error",
+        "Please check your OpenAI API key configuration.",
+        "Set OPENAI_API_KEY environment variable or run 'deepshell --help' for setup instructions.",
+    ),
+    (
+        "rate limit",
+        "Rate Limit Exceeded",
+        "Please wait a moment before making another request.",
+    ),
+    (
+        "timeout",
+        "Request Timeout",
+        "The request took too long. Try again or check your connection.",
+    ),
+    (
+        "connection",
+        "Connection Error",
+        "Could not connect to OpenAI API. Check your internet connection.",
+    ),
+)
+
+# Minimum time between live re-renders while streaming (seconds)
+_STREAM_UPDATE_INTERVAL = 0.1
+
+# Block parser used to find finished markdown blocks while streaming,
+# configured like the one rich.markdown uses
+_md_parser = MarkdownIt().enable("strikethrough").enable("table")
+
+# Blocks that Rich renders starting with their own blank line
+_MD_CONTAINERS = frozenset({"blockquote_open", "bullet_list_open", "ordered_list_open", "table_open"})
+
+# A ']' not opening an inline link may be a reference link whose
+# definition is still to come; such blocks are never printed early
+_MAYBE_REFERENCE_RE = re.compile(r"\](?!\()")
+
+# Responses that end within this many chunks or characters skip Live
+_LOOKAHEAD_CHUNKS = 4
+_LOOKAHEAD_CHARS = 256
+
+
+# Semaphores bounding in-flight async requests, one per event loop since
+# asyncio primitives cannot be shared between loops
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Get the concurrency semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(config.get("MAX_CONCURRENCY"))
+    return semaphore
+
+
+def _fake_stream(content: str, size: int = 64) -> Generator[str, None, None]:
+    """Split a complete response into chunks for stream_response."""
+    for i in range(0, len(content), size):
+        yield content[i:i + size]
 
 
 class BaseHandler:
@@ -30,6 +99,16 @@ class BaseHandler:
     caching, and function calling support.
     """
 
+    __slots__ = (
+        "persona",
+        "markdown",
+        "client",
+        "color",
+        "code_theme",
+        "_default_model",
+        "_valid_models",
+    )
+
     def __init__(self, persona: Persona, markdown: bool = True) -> None:
         """
         Initialize base handler.
@@ -39,13 +118,17 @@ class BaseHandler:
             markdown: Whether to enable markdown formatting
         """
         self.persona = persona
-        self.markdown = markdown and "APPLY MARKDOWN" in persona.system_prompt
+        self.markdown = markdown and persona.apply_markdown
         self.client = get_client()
 
         # Display configuration
         self.color = config.get("DEFAULT_COLOR")
         self.code_theme = config.get("CODE_THEME")
 
+        # Resolved once for validate_options
+        self._default_model = config.get("DEFAULT_MODEL")
+        self._valid_models = frozenset(self.client.get_available_models())
+
     def make_messages(self, prompt: str) -> List[Dict[str, str]]:
         """
         Create message list for API call.
@@ -97,6 +180,21 @@ class BaseHandler:
             **kwargs
         )
 
+    def _extract_content(self, response: Any) -> Optional[str]:
+        """
+        Get the message content from a non-streaming response.
+
+        Args:
+            response: Completion response
+
+        Returns:
+            Message content, or None if the response is malformed or empty
+        """
+        try:
+            return response.choices[0].message.content
+        except (AttributeError, IndexError, TypeError):
+            return None
+
     def handle_function_call(
         self,
         messages: List[Dict[str, Any]],
@@ -127,13 +225,16 @@ class BaseHandler:
             }]
         })
 
-        yield f"\n🔧 Calling function: {function_name}\n"
+        # Build the whole status block and yield it once, so the display
+        # re-renders once per call
+        parts = ["\n🔧 Calling function: ", function_name, "\n"]
 
         try:
             # Parse function arguments
-            args = json.loads(function_args)
-            args_str = ", ".join(f'{k}="{v}"' for k, v in args.items())
-            yield f"Arguments: {args_str}\n\n"
+            args = loads(function_args)
+            parts.append("Arguments: ")
+            parts.append(", ".join(f'{k}="{v}"' for k, v in args.items()))
+            parts.append("\n\n")
 
             # Execute function (placeholder - would need actual function registry)
             result = f"Function {function_name} executed successfully"
@@ -145,11 +246,11 @@ class BaseHandler:
                 "tool_call_id": "call_1"  # Would be generated in real implementation
             })
 
-            yield f"Result: {result}\n\n"
+            parts += ("Result: ", result, "\n\n")
 
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             error_msg = f"Error parsing function arguments: {e}"
-            yield f"❌ {error_msg}\n\n"
+            parts += ("❌ ", error_msg, "\n\n")
 
             messages.append({
                 "role": "tool",
@@ -159,7 +260,7 @@ class BaseHandler:
 
         except Exception as e:
             error_msg = f"Error executing function: {e}"
-            yield f"❌ {error_msg}\n\n"
+            parts += ("❌ ", error_msg, "\n\n")
 
             messages.append({
                 "role": "tool",
@@ -167,6 +268,8 @@ class BaseHandler:
                 "tool_call_id": "call_1"
             })
 
+        yield "".join(parts)
+
     def format_response(self, content: str) -> Union[Markdown, Syntax, Text]:
         """
         Format response content for display.
@@ -197,32 +300,152 @@ class BaseHandler:
         Returns:
             Complete response text
         """
-        full_response = ""
+        # Short or replayed responses often arrive in a few chunks; print
+        # those directly instead of setting up a live display
+        chunks = iter(response_generator)
+        lookahead = []
+        size = 0
+        for chunk in chunks:
+            lookahead.append(chunk)
+            size += len(chunk)
+            if len(lookahead) >= _LOOKAHEAD_CHUNKS or size >= _LOOKAHEAD_CHARS:
+                break
+        else:
+            full_response = "".join(lookahead)
+            if full_response:
+                self.print_response(full_response)
+            return full_response
 
         with Live(console=console, refresh_per_second=10) as live:
-            for chunk in response_generator:
-                full_response += chunk
-
-                # Format and display current response
-                if self.markdown:
-                    display_content = Markdown(full_response)
-                else:
-                    display_content = Text(full_response, style=self.color)
-
-                if show_cursor:
-                    # Add typing cursor
-                    cursor = Text("▋", style="bold white")
-                    if isinstance(display_content, Text):
-                        display_content.append(cursor)
-                    else:
-                        # For Markdown, we'll add cursor as separate element
-                        live.update(display_content)
-                        continue
-
-                live.update(display_content)
+            chunks = itertools.chain(lookahead, chunks)
+            if self.markdown:
+                return self._stream_markdown(chunks, live)
+            return self._stream_text(chunks, live, show_cursor)
+
+    def _stream_text(self, chunks: Iterator[str], live: Live, show_cursor: bool) -> str:
+        """
+        Stream a plain-text response into a live display.
+
+        Args:
+            chunks: Response chunks
+            live: Active live display
+            show_cursor: Whether to show typing cursor
 
+        Returns:
+            Complete response text
+        """
+        parts = []
+        append = parts.append
+        last_update = 0.0
+
+        for chunk in chunks:
+            append(chunk)
+
+            # Only refresh at the display rate
+            now = time.monotonic()
+            if now - last_update < _STREAM_UPDATE_INTERVAL:
+                continue
+
+            display_content = Text("".join(parts), style=self.color)
+            if show_cursor:
+                display_content.append("▋", style="bold white")
+            live.update(display_content)
+            last_update = now
+
+        full_response = "".join(parts)
+        live.update(Text(full_response, style=self.color))
         return full_response
 
+    def _stream_markdown(self, chunks: Iterator[str], live: Live) -> str:
+        """
+        Stream a markdown response into a live display.
+
+        Finished blocks are printed once above the live region, which then
+        only re-renders the unfinished tail.
+
+        Args:
+            chunks: Response chunks
+            live: Active live display
+
+        Returns:
+            Complete response text
+        """
+        parts = []
+        append = parts.append
+        # Chunks not yet printed above the live region
+        tail = []
+        # Link reference definitions from printed blocks, as markdown
+        # lines, so the tail still resolves references to them
+        refs = {}
+        last_update = 0.0
+
+        for chunk in chunks:
+            append(chunk)
+            tail.append(chunk)
+
+            # A new block can only start on a new line
+            if "\n" in chunk:
+                tail = [self._commit_blocks("".join(tail), live, refs)]
+
+            # Only refresh at the display rate
+            now = time.monotonic()
+            if now - last_update < _STREAM_UPDATE_INTERVAL:
+                continue
+
+            live.update(Markdown("".join(refs.values()) + "".join(tail)))
+            last_update = now
+
+        live.update(Markdown("".join(refs.values()) + "".join(tail)))
+        return "".join(parts)
+
+    def _commit_blocks(self, tail: str, live: Live, refs: Dict[str, str]) -> str:
+        """
+        Print completed markdown blocks above the live region.
+
+        A block is complete once the parser sees another top-level block
+        start after it; only the last block can still change. The block
+        after the printed ones is held back too, since the blank line
+        between them depends on what kind of block it turns out to be.
+        Blocks that may hold reference links are never printed early, as
+        their definitions can come later in the response.
+
+        Args:
+            tail: Unprinted response text
+            live: Active live display
+            refs: Reference definitions of printed blocks, updated in place
+
+        Returns:
+            Text still to be printed
+        """
+        env = {}
+        blocks = []
+        held = None
+        for token in _md_parser.parse(tail, env):
+            if token.level == 0 and token.map is not None:
+                blocks.append(token)
+            elif held is None and token.type == "inline" and _MAYBE_REFERENCE_RE.search(token.content):
+                held = len(blocks) - 1
+
+        # Print up to the second-to-last block or the first held one
+        end = len(blocks) - 2 if held is None else min(held, len(blocks) - 2)
+        if end < 1:
+            return tail
+
+        # token.map counts "\n"-separated lines; splitlines() would also
+        # split on characters such as \x0c or \u2028
+        split = blocks[end].map[0]
+        lines = tail.split("\n")
+        live.console.print(Markdown("\n".join(lines[:split]) + "\n"))
+        # Rich puts a blank line between blocks, except after a rule;
+        # container blocks render their own
+        if blocks[end - 1].type != "hr" and blocks[end].type not in _MD_CONTAINERS:
+            live.console.print()
+
+        for label, ref in env.get("references", {}).items():
+            title = ref["title"].replace('"', '\\"')
+            refs.setdefault(label, f'[{label}]: <{ref["href"]}> "{title}"\n\n')
+        return "\n".join(lines[split:])
+
     def print_response(self, content: str) -> None:
         """
         Print formatted response.
@@ -243,25 +466,15 @@ class BaseHandler:
         error_msg = str(error)
 
         # Provide helpful error messages for common issues
-        if "api key" in error_msg.lower():
-            console.print("[red]❌ API Key Error[/red]")
-            console.print("Please check your OpenAI API key configuration.")
-            console.print("Set OPENAI_API_KEY environment variable or run 'deepshell --help' for setup instructions.")
-
-        elif "rate limit" in error_msg.lower():
-            console.print("[red]❌ Rate Limit Exceeded[/red]")
-            console.print("Please wait a moment before making another request.")
-
-        elif "timeout" in error_msg.lower():
-            console.print("[red]❌ Request Timeout[/red]")
-            console.print("The request took too long. Try again or check your connection.")
+        lowered = error_msg.lower()
+        for keyword, title, *advice in _ERROR_MESSAGES:
+            if keyword in lowered:
+                console.print(f"[red]❌ {title}[/red]", highlight=False)
+                for line in advice:
+                    console.print(line, highlight=False)
+                return
 
-        elif "connection" in error_msg.lower():
-            console.print("[red]❌ Connection Error[/red]")
-            console.print("Could not connect to OpenAI API. Check your internet connection.")
-
-        else:
-            console.print(f"[red]❌ Error: {error_msg}[/red]")
+        console.print(f"[red]❌ Error: {error_msg}[/red]", highlight=False)
 
     def validate_options(self, **options) -> Dict[str, Any]:
         """
@@ -276,36 +489,37 @@ class BaseHandler:
         validated = {}
 
         # Model validation
-        model = options.get("model", config.get("DEFAULT_MODEL"))
-        if not self.client.validate_model(model):
-            console.print(f"[yellow]Warning: Unknown model '{model}', using default[/yellow]")
-            model = config.get("DEFAULT_MODEL")
+        model = options.get("model") or self._default_model
+        if model not in self._valid_models:
+            console.print(f"[yellow]Warning: Unknown model '{model}', using default[/yellow]", highlight=False)
+            model = self._default_model
         validated["model"] = model
 
         # Temperature validation
         temperature = options.get("temperature", 0.0)
         if not 0.0 <= temperature <= 2.0:
-            console.print(f"[yellow]Warning: Temperature {temperature} out of range, clamping to 0.0-2.0[/yellow]")
+            console.print(f"[yellow]Warning: Temperature {temperature} out of range, clamping to 0.0-2.0[/yellow]", highlight=False)
             temperature = max(0.0, min(2.0, temperature))
         validated["temperature"] = temperature
 
         # Top-p validation
         top_p = options.get("top_p", 1.0)
         if not 0.0 <= top_p <= 1.0:
-            console.print(f"[yellow]Warning: top_p {top_p} out of range, clamping to 0.0-1.0[/yellow]")
+            console.print(f"[yellow]Warning: top_p {top_p} out of range, clamping to 0.0-1.0[/yellow]", highlight=False)
             top_p = max(0.0, min(1.0, top_p))
         validated["top_p"] = top_p
 
         # Max tokens validation
         max_tokens = options.get("max_tokens")
         if max_tokens is not None and max_tokens <= 0:
-            console.print(f"[yellow]Warning: max_tokens must be positive, ignoring[/yellow]")
+            console.print(f"[yellow]Warning: max_tokens must be positive, ignoring[/yellow]", highlight=False)
             max_tokens = None
         validated["max_tokens"] = max_tokens
 
         # Boolean options
         validated["stream"] = bool(options.get("stream", True))
         validated["cache"] = bool(options.get("cache", True))
+        validated["pseudo_stream"] = bool(options.get("pseudo_stream", True))
 
         funcs = options.get("functions")
         if funcs is None or isinstance(funcs, list):
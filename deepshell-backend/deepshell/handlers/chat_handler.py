@@ -1,20 +1,204 @@
-import json
 import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 
-from .base_handler import BaseHandler
+from .base_handler import BaseHandler, _fake_stream
+from .._console import console
+from .._json import dumps, loads
 from ..persona import Persona
+from ..cache import _message_text
 from ..config import config
-from ..llm import get_global_client  # <-- Import the new client getter
+from ..llm import cache_breakpoint, get_global_client  # <-- Import the new client getter
 
-console = Console()
 
-# ... (ChatSession class remains unchanged) ...
+# History is compacted once it fills this share of the model's context window
+_COMPACT_RATIO = 0.8
+# Most recent turns (user + assistant pairs) kept verbatim when compacting
+_COMPACT_KEEP_TURNS = 4
+# Turns to wait before retrying a failed compaction, doubled per failure
+_COMPACT_MAX_BACKOFF = 16
+
+# Marks the system message holding a compaction summary
+_CHECKPOINT_TAG = "[CHECKPOINT]"
+
+_CHECKPOINT_PROMPT = """Summarize the conversation below as a checkpoint for continuing it.
+Use exactly these four sections, as short bullet lists:
+Decisions, Constraints, Open tasks, Rejected approaches.
+
+{transcript}"""
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str) -> Any:
+    """Get the tiktoken encoding for a model, or None if it is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Not installed, unknown model, or the encoding could not be fetched
+        return None
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], model: str) -> int:
+    """
+    Estimate the prompt tokens of a message list.
+
+    Counts exactly with tiktoken when it is available and falls back to
+    roughly four characters per token otherwise.
+    """
+    text = "".join(_message_text(m) for m in messages)
+    encoding = _get_encoding(model)
+    if encoding is None:
+        tokens = len(text) // 4
+    else:
+        tokens = len(encoding.encode(text, disallowed_special=()))
+    # Per-message framing overhead
+    return tokens + 4 * len(messages)
+
+
+class ChatSession:
+    """
+    Conversation history for a chat session.
+
+    Messages live in two zones: a byte-stable prefix (the system prompt and
+    completed turns) that is only ever appended to, and a volatile tail
+    holding the turn in progress. Keeping the prefix stable lets providers
+    serve it from their prompt cache on every following turn.
+    """
+
+    def __init__(self, session_id: str, max_length: int) -> None:
+        self.session_id = session_id
+        self.max_length = max_length
+        self.prefix_messages: List[Dict[str, Any]] = []
+        self.tail_messages: List[Dict[str, Any]] = []
+        # Estimated tokens per prefix message for _token_model, kept in step
+        # with the prefix so each turn only counts the messages it adds
+        self._token_model: Optional[str] = None
+        self._token_counts: List[int] = []
+
+        # Temporary sessions are never written to disk
+        self.session_file = None
+        if session_id != "temp":
+            storage_path = Path(config.get("CHAT_CACHE_PATH"))
+            storage_path.mkdir(parents=True, exist_ok=True)
+            self.session_file = storage_path / f"{session_id}.json"
+            self._load()
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """All messages in the session, prefix first."""
+        return self.prefix_messages + self.tail_messages
+
+    def add_message(self, role: str, content: str) -> None:
+        """
+        Add a message to the session.
+
+        A user message starts a new tail, dropping any turn left unanswered.
+        System messages and assistant replies close the current turn, so the
+        tail graduates into the prefix and the session is saved.
+
+        Args:
+            role: Message role (system, user or assistant)
+            content: Message content
+        """
+        if role == "user":
+            self.tail_messages = []
+        self.tail_messages.append({"role": role, "content": content})
+        if role in ("system", "assistant"):
+            self.prefix_messages.extend(self.tail_messages)
+            self._token_counts.extend(self._count(self.tail_messages))
+            self.tail_messages = []
+            self._trim()
+            self._save()
+
+    def get_messages(self) -> List[Dict[str, Any]]:
+        """
+        Get messages for an API call.
+
+        The last prefix turn is marked as a prompt-cache breakpoint; the
+        system message is marked by the client.
+        """
+        prefix = self.prefix_messages
+        if len(prefix) > 1 and config.get("PROMPT_CACHE") in (True, "true"):
+            prefix = prefix[:-1] + [cache_breakpoint(prefix[-1])]
+        return prefix + self.tail_messages
+
+    def count_tokens(self, model: str) -> int:
+        """Estimated prompt tokens of the whole session for a model."""
+        if model != self._token_model:
+            self._token_model = model
+            self._token_counts = self._count(self.prefix_messages)
+        return sum(self._token_counts) + estimate_tokens(self.tail_messages, model)
+
+    def compactable(self, keep: int) -> List[Dict[str, Any]]:
+        """Prefix messages that compact() would replace, keeping the last keep."""
+        start = 1 if self.prefix_messages and self.prefix_messages[0]["role"] == "system" else 0
+        return self.prefix_messages[start:max(start, len(self.prefix_messages) - keep)]
+
+    def compact(self, summary: str, keep: int) -> None:
+        """
+        Replace older prefix messages with a checkpoint summary.
+
+        The system message and the last keep messages stay verbatim; the
+        checkpoint goes between them as a system message.
+
+        Args:
+            summary: Checkpoint text summarizing the replaced messages
+            keep: Number of most recent prefix messages to keep
+        """
+        start = 1 if self.prefix_messages and self.prefix_messages[0]["role"] == "system" else 0
+        end = max(start, len(self.prefix_messages) - keep)
+        checkpoint = [{"role": "system", "content": f"{_CHECKPOINT_TAG}\n{summary}"}]
+        self.prefix_messages[start:end] = checkpoint
+        self._token_counts[start:end] = self._count(checkpoint)
+        self._save()
+
+    def clear(self) -> None:
+        """Remove all messages and the saved session file."""
+        self.prefix_messages = []
+        self.tail_messages = []
+        self._token_counts = []
+        if self.session_file is not None and self.session_file.exists():
+            self.session_file.unlink()
+
+    def _trim(self) -> None:
+        """Drop the oldest turns once the prefix exceeds max_length, keeping the system message."""
+        excess = len(self.prefix_messages) - self.max_length
+        if excess <= 0:
+            return
+        start = 1 if self.prefix_messages[0]["role"] == "system" else 0
+        del self.prefix_messages[start:start + excess]
+        del self._token_counts[start:start + excess]
+
+    def _count(self, messages: List[Dict[str, Any]]) -> List[int]:
+        """Token estimates for messages, once a model is being counted for."""
+        if self._token_model is None:
+            return []
+        return [estimate_tokens([m], self._token_model) for m in messages]
+
+    def _load(self) -> None:
+        """Load saved messages into the prefix."""
+        if not self.session_file.exists():
+            return
+        try:
+            self.prefix_messages = loads(self.session_file.read_bytes())
+        except (OSError, ValueError) as e:
+            console.print(f"[yellow]Warning: Could not load chat session {self.session_id}: {e}[/yellow]")
+
+    def _save(self) -> None:
+        """Persist the prefix; the tail is rebuilt every turn."""
+        if self.session_file is None:
+            return
+        try:
+            self.session_file.write_bytes(dumps(self.prefix_messages))
+        except OSError as e:
+            console.print(f"[yellow]Warning: Could not save chat session {self.session_id}: {e}[/yellow]")
+
 
 class ChatHandler(BaseHandler):
     """
@@ -24,6 +208,8 @@ class ChatHandler(BaseHandler):
     multi-turn interactions.
     """
 
+    __slots__ = ("session", "_compact_failures", "_compact_skip")
+
     def __init__(self, session_id: str, persona: Persona, markdown: bool = True) -> None:
         super().__init__(persona, markdown)
 
@@ -31,17 +217,64 @@ class ChatHandler(BaseHandler):
             session_id=session_id,
             max_length=config.get("CHAT_CACHE_LENGTH")
         )
+        # Failed compactions in a row, and turns left before the next try
+        self._compact_failures = 0
+        self._compact_skip = 0
 
         # Add system message if this is a new session
         if not self.session.messages:
             self.session.add_message("system", self.persona.system_prompt)
 
-    def make_messages(self, prompt: str) -> List[Dict[str, str]]:
-        # Add user message to session
+    def make_messages(self, prompt: str, model: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Keep long histories within the model's context window
+        self._compact_session(model or self._default_model)
+        # Add user message to the volatile tail
         self.session.add_message("user", prompt)
-        # Return all messages for API call
+        # Stable prefix + tail for the API call
         return self.session.get_messages()
 
+    def _compact_session(self, model: str) -> None:
+        """
+        Fold older turns into a checkpoint summary once the history nears
+        the model's context window.
+
+        The summary is requested once per compaction; the latest turns are
+        kept verbatim. Compaction waits until it would fold in more than one
+        new turn, and backs off after a failed summary.
+        """
+        if self._compact_skip:
+            self._compact_skip -= 1
+            return
+
+        limit = _COMPACT_RATIO * self.client.get_context_window(model)
+        if self.session.count_tokens(model) <= limit:
+            return
+
+        old_messages = self.session.compactable(2 * _COMPACT_KEEP_TURNS)
+        # Re-summarizing the last checkpoint with a single turn saves little
+        new_messages = [
+            m for m in old_messages
+            if not (m["role"] == "system" and _message_text(m).startswith(_CHECKPOINT_TAG))
+        ]
+        if len(new_messages) <= 2:
+            return
+
+        transcript = "\n\n".join(f"{m['role']}: {_message_text(m)}" for m in old_messages)
+        response = self.client.chat(
+            _CHECKPOINT_PROMPT.format(transcript=transcript),
+            model=model,
+            cache=False,
+        )
+        summary = self._extract_content(response)
+        if not summary or summary.startswith("❌"):
+            console.print("[yellow]Warning: Could not compact chat history; sending it in full[/yellow]")
+            self._compact_failures += 1
+            self._compact_skip = min(2 ** self._compact_failures, _COMPACT_MAX_BACKOFF)
+            return
+
+        self._compact_failures = 0
+        self.session.compact(summary, 2 * _COMPACT_KEEP_TURNS)
+
     def get_completion(self, messages, provider=None, **options):
         """
         Get completion from the selected LLM provider.
@@ -59,7 +292,7 @@ class ChatHandler(BaseHandler):
             validated_options = self.validate_options(**options)
 
             # Create messages with history
-            messages = self.make_messages(prompt)
+            messages = self.make_messages(prompt, validated_options["model"])
 
             # Get response
             if validated_options["stream"]:
@@ -83,19 +316,15 @@ class ChatHandler(BaseHandler):
                     **validated_options
                 )
 
-                # Defensive: check for response structure
-                if not response or not hasattr(response, 'choices') or not response.choices:
+                content = self._extract_content(response)
+                if content is None:
                     console.print("[red]Error: Invalid response from LLM[/red]")
                     return
-                if not hasattr(response.choices[0], 'message') or not response.choices[0].message:
-                    console.print("[red]Error: Invalid message in response[/red]")
-                    return
-                if not hasattr(response.choices[0].message, 'content'):
-                    console.print("[red]Error: No content in response message[/red]")
-                    return
 
-                content = response.choices[0].message.content
-                self.print_response(content)
+                if validated_options["pseudo_stream"]:
+                    self.stream_response(_fake_stream(content), show_cursor=False)
+                else:
+                    self.print_response(content)
 
                 # Add assistant response to session
                 self.session.add_message("assistant", content)
@@ -4,15 +4,68 @@ Default handler for single prompt/response interactions.
 Handles one-shot queries without conversation history or persistence.
 """
 
-from typing import Any, Dict, List
-
-from rich.console import Console
-
-from .base_handler import BaseHandler
+import asyncio
+import hashlib
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from .base_handler import BaseHandler, _fake_stream, _get_semaphore
+from .._console import console
+from .._json import dumps, loads
 from ..persona import Persona
 from ..llm import get_global_client
+from ..utils import run_shell_command
+
+
+# Batch job states after which no more polling is needed
+_BATCH_DONE_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+# Completed batch results are fsynced to the output file this often
+_BATCH_FSYNC_EVERY = 128
+
+# The LLM client reports a failed stream as a final chunk with this prefix
+_STREAM_ERROR_PREFIX = "❌ Streaming Error:"
 
-console = Console()
+
+def _watch_errors(chunks: Iterator[str], failed: List[bool]) -> Iterator[str]:
+    """Pass stream chunks through, noting in failed if the stream errored."""
+    for chunk in chunks:
+        if chunk.startswith(_STREAM_ERROR_PREFIX):
+            failed.append(True)
+        yield chunk
+
+
+def _custom_id(prompt: str) -> str:
+    """Batch request id for a prompt, independent of its position."""
+    return "req-" + hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _load_done(path: str) -> Dict[str, str]:
+    """
+    Read completed batch results from a JSONL output file.
+
+    Args:
+        path: Output file written by handle_many
+
+    Returns:
+        Response content by custom_id
+    """
+    done = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = loads(line)
+                custom_id = record["custom_id"]
+                content = record["response"]
+            except (ValueError, KeyError, TypeError):
+                # Partial last line from an interrupted run, or a foreign record
+                continue
+            if isinstance(content, str):
+                done[custom_id] = content
+    return done
 
 
 class DefaultHandler(BaseHandler):
@@ -23,6 +76,8 @@ class DefaultHandler(BaseHandler):
     returns a response without maintaining conversation history.
     """
 
+    __slots__ = ()
+
     def __init__(self, persona: Persona, markdown: bool = True) -> None:
         """
         Initialize default handler.
@@ -60,7 +115,15 @@ class DefaultHandler(BaseHandler):
         client = get_global_client(provider)
         return client.complete(messages, **options)
 
-    def handle(self, prompt: str, provider=None, **options) -> None:
+    async def aget_completion(self, messages, provider=None, **options):
+        """
+        Get a non-streaming completion from the selected LLM provider.
+        """
+        async with _get_semaphore():
+            client = get_global_client(provider)
+            return await client.acomplete(messages, **options)
+
+    def handle(self, prompt: str, provider=None, **options) -> bool:
         """
         Handle single prompt/response interaction.
 
@@ -68,10 +131,13 @@ class DefaultHandler(BaseHandler):
             prompt: User prompt to process
             provider: LLM provider to use (openai)
             **options: Handler options (model, temperature, etc.)
+
+        Returns:
+            True if a response was shown, False if the request failed
         """
         if not prompt.strip():
             console.print("[red]Error: Empty prompt provided[/red]")
-            return
+            return False
 
         try:
             # Validate options
@@ -92,9 +158,12 @@ class DefaultHandler(BaseHandler):
                 # Check if response_generator is actually iterable
                 if not hasattr(response_generator, '__iter__'):
                     console.print(f"[red]Error: Expected streaming response, got: {type(response_generator)}[/red]")
-                    return
+                    return False
 
-                full_response = self.stream_response(response_generator)
+                failed = []
+                full_response = self.stream_response(_watch_errors(response_generator, failed))
+                if failed:
+                    return False
 
                 # Handle shell command execution if requested
                 if validated_options.get("interactive", False):
@@ -108,39 +177,264 @@ class DefaultHandler(BaseHandler):
                     **validated_options
                 )
 
-                # Defensive: check for response structure
-                if not response:
-                    console.print("[red]Error: No response from LLM[/red]")
-                    return
-
-                # Check if it's a MockResponse (error case)
-                if hasattr(response, 'choices') and hasattr(response.choices[0], 'message'):
-                    if hasattr(response.choices[0].message, 'content'):
-                        content = response.choices[0].message.content
-
-                        # Check if it's an error message
-                        if content.startswith("❌ Error:"):
-                            console.print(f"[red]{content}[/red]")
-                            return
-
-                        self.print_response(content)
-
-                        # Handle shell command execution if requested
-                        if validated_options.get("interactive", False):
-                            self._handle_shell_interaction(content)
-                    else:
-                        console.print("[red]Error: No content in response message[/red]")
-                        return
-                else:
+                content = self._extract_content(response)
+                if content is None:
                     console.print(f"[red]Error: Invalid response structure: {type(response)}[/red]")
-                    return
+                    return False
+
+                # Check if it's an error message
+                if content.startswith("❌ Error:"):
+                    console.print(f"[red]{content}[/red]")
+                    return False
+
+                if validated_options["pseudo_stream"]:
+                    self.stream_response(_fake_stream(content), show_cursor=False)
+                else:
+                    self.print_response(content)
+
+                # Handle shell command execution if requested
+                if validated_options.get("interactive", False):
+                    self._handle_shell_interaction(content)
 
         except KeyboardInterrupt:
             console.print("\n[yellow]Operation cancelled by user[/yellow]")
+            return False
+
+        except Exception as e:
+            console.print(f"[red]Handler Error: {str(e)}[/red]")
+            self.handle_error(e)
+            return False
+
+        return True
+
+    async def handle_async(self, prompt: str, provider=None, **options) -> Optional[str]:
+        """
+        Get the response to a single prompt without printing it.
+
+        Args:
+            prompt: User prompt to process
+            provider: LLM provider to use (openai)
+            **options: Handler options (model, temperature, etc.)
+
+        Returns:
+            Response content, or None if the request failed
+        """
+        if not prompt.strip():
+            console.print("[red]Error: Empty prompt provided[/red]")
+            return None
+
+        try:
+            validated_options = self.validate_options(**options)
+            validated_options["stream"] = False
+
+            response = await self.aget_completion(
+                messages=self.make_messages(prompt),
+                provider=provider,
+                **validated_options
+            )
+
+            content = self._extract_content(response)
+            if content is None:
+                console.print(f"[red]Error: Invalid response structure: {type(response)}[/red]")
+                return None
+            if content.startswith("❌ Error:"):
+                console.print(f"[red]{content}[/red]")
+                return None
+
+            return content
 
         except Exception as e:
             console.print(f"[red]Handler Error: {str(e)}[/red]")
             self.handle_error(e)
+            return None
+
+    async def handle_batch(self, prompts: List[str], provider=None, **options) -> List[Optional[str]]:
+        """
+        Run several prompts concurrently and print the results.
+
+        Requests overlap up to the MAX_CONCURRENCY limit; results are
+        printed in prompt order once all of them are in.
+
+        Args:
+            prompts: User prompts to process
+            provider: LLM provider to use (openai)
+            **options: Handler options (model, temperature, etc.)
+
+        Returns:
+            Response contents in prompt order, None for failed prompts
+        """
+        results = await asyncio.gather(
+            *(self.handle_async(prompt, provider=provider, **options) for prompt in prompts)
+        )
+        for i, content in enumerate(results):
+            if content is None:
+                console.print(f"[red]Error: Request {i + 1} failed[/red]")
+            else:
+                self.print_response(content)
+        return results
+
+    async def handle_many(
+        self,
+        prompts: List[str],
+        provider=None,
+        poll_interval: float = 60.0,
+        output_path: Optional[str] = None,
+        **options
+    ) -> List[Optional[str]]:
+        """
+        Run prompts through the provider's Batch API and print the results.
+
+        Batch jobs are billed at a discount but can take up to 24 hours;
+        use handle_batch for results right away. With output_path, results
+        are appended to a JSONL file and prompts already recorded there are
+        skipped, and the id of a submitted batch is kept next to it until the
+        batch finishes, so an interrupted run resumes instead of resubmitting.
+
+        Args:
+            prompts: User prompts to process
+            provider: LLM provider to use (openai)
+            poll_interval: Seconds between batch status checks
+            output_path: JSONL file to record completed results in
+            **options: Handler options (model, temperature, etc.)
+
+        Returns:
+            Response contents in prompt order, None for failed prompts
+        """
+        validated_options = self.validate_options(**options)
+
+        # Requests are keyed by prompt, so editing the prompts file can't
+        # misattribute recorded answers; repeated prompts are sent once
+        indices: Dict[str, List[int]] = {}
+        for i, prompt in enumerate(prompts):
+            indices.setdefault(_custom_id(prompt), []).append(i)
+
+        done = _load_done(output_path) if output_path else {}
+        results: List[Optional[str]] = [None] * len(prompts)
+        for custom_id, content in done.items():
+            for i in indices.get(custom_id, ()):
+                results[i] = content
+        if done:
+            console.print(f"[dim]Skipping {sum(r is not None for r in results)} completed requests[/dim]")
+
+        client = get_global_client(provider)
+        pending_path = f"{output_path}.batch" if output_path else None
+        completed: List[int] = []
+
+        if pending_path and os.path.exists(pending_path):
+            with open(pending_path, "r", encoding="utf-8") as f:
+                batch_id = f.read().strip()
+            console.print(f"[dim]Resuming batch {batch_id}[/dim]")
+            batch = await client.aretrieve_batch(batch_id)
+            completed += await self._collect_batch(client, batch, poll_interval, indices, results, output_path)
+            os.remove(pending_path)
+
+        lines = []
+        for custom_id, positions in indices.items():
+            if results[positions[0]] is not None:
+                continue
+            body = {
+                "model": validated_options["model"],
+                "messages": self.make_messages(prompts[positions[0]]),
+                "temperature": validated_options["temperature"],
+                "top_p": validated_options["top_p"],
+            }
+            if validated_options["max_tokens"] is not None:
+                body["max_tokens"] = validated_options["max_tokens"]
+            lines.append(dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }))
+
+        if lines:
+            batch = await client.asubmit_batch(b"\n".join(lines) + b"\n")
+            console.print(f"[dim]Submitted batch {batch.id} with {len(lines)} requests[/dim]")
+            if pending_path:
+                with open(pending_path, "w", encoding="utf-8") as f:
+                    f.write(batch.id)
+            completed += await self._collect_batch(client, batch, poll_interval, indices, results, output_path)
+            if pending_path:
+                os.remove(pending_path)
+
+        completed_set = set(completed)
+        for i, content in enumerate(results):
+            if i in completed_set:
+                self.print_response(content)
+            elif content is None:
+                console.print(f"[red]Error: Request {i + 1} failed[/red]")
+
+        return results
+
+    async def _collect_batch(
+        self,
+        client,
+        batch,
+        poll_interval: float,
+        indices: Dict[str, List[int]],
+        results: List[Optional[str]],
+        output_path: Optional[str],
+    ) -> List[int]:
+        """
+        Wait for a batch job to finish and record its results.
+
+        Args:
+            client: LLM client the batch was submitted with
+            batch: Batch job as last retrieved
+            poll_interval: Seconds between batch status checks
+            indices: Prompt positions by custom_id
+            results: Response contents in prompt order, filled in place
+            output_path: JSONL file to record completed results in
+
+        Returns:
+            Prompt positions that were completed by this batch
+        """
+        while batch.status not in _BATCH_DONE_STATUSES:
+            await asyncio.sleep(poll_interval)
+            batch = await client.aretrieve_batch(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            console.print(f"[red]Error: Batch {batch.id} ended with status '{batch.status}'[/red]")
+            return []
+
+        output = await client.abatch_output(batch.output_file_id)
+        completed = []
+        recorded = 0
+        out_file = open(output_path, "ab") if output_path else None
+        try:
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = loads(line)
+                    custom_id = record["custom_id"]
+                    response = record.get("response") or {}
+                    if response.get("status_code") != 200:
+                        continue
+                    content = response["body"]["choices"][0]["message"]["content"]
+                except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                    # Malformed record; its prompt is reported as failed
+                    continue
+                if not isinstance(content, str) or custom_id not in indices:
+                    continue
+
+                for i in indices[custom_id]:
+                    results[i] = content
+                    completed.append(i)
+
+                if out_file is not None:
+                    out_file.write(dumps({"custom_id": custom_id, "response": content}) + b"\n")
+                    recorded += 1
+                    if recorded % _BATCH_FSYNC_EVERY == 0:
+                        out_file.flush()
+                        os.fsync(out_file.fileno())
+        finally:
+            if out_file is not None:
+                out_file.flush()
+                os.fsync(out_file.fileno())
+                out_file.close()
+
+        return completed
 
     def _handle_shell_interaction(self, response: str) -> None:
         """
@@ -157,11 +451,9 @@ class DefaultHandler(BaseHandler):
         command = response.strip()
 
         # Skip if response doesn't look like a shell command
-        if not command or "\n" in command or len(command) > 200:
+        if not command or len(command) > 200 or "\n" in command:
             return
 
-        from ..utils import run_shell_command
-
         try:
             run_shell_command(command, interactive=True)
         except Exception as e:
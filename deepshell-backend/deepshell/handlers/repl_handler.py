@@ -6,21 +6,52 @@ Provides a Read-Eval-Print Loop interface for continuous interaction
 with the AI assistant.
 """
 
+import asyncio
+import hashlib
+import signal
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 
 from prompt_toolkit import PromptSession
-from prompt_toolkit.history import InMemoryHistory
+from prompt_toolkit.history import FileHistory
 from prompt_toolkit.key_binding import KeyBindings
-from rich.console import Console
+from prompt_toolkit.patch_stdout import patch_stdout
 from rich.panel import Panel
 from rich.text import Text
 
 from .chat_handler import ChatHandler
-from ..persona import Persona
+from .default_handler import DefaultHandler
+from .._console import console
+from ..config import config
+from ..persona import Persona, get_persona, get_persona_manager
 from ..utils import run_shell_command
 
-console = Console()
+
+# Prompt shown for each persona; others get the robot
+_PROMPT_GLYPHS = {
+    "shell": "🐚 ",
+    "code": "💻 ",
+    "coder": "💻 ",
+    "reasoning": "🧠 ",
+}
+
+# Seconds to let a cancelled response wind down before returning to the prompt
+_CANCEL_GRACE = 1.0
+
+
+def _prompt_hash(prompt: str) -> bytes:
+    """Digest a system prompt to check it stays byte-stable."""
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+
+
+def _until(event: threading.Event, chunks: Iterable[str]) -> Iterator[str]:
+    """Yield chunks until the event is set."""
+    for chunk in chunks:
+        if event.is_set():
+            return
+        yield chunk
 
 
 class ReplHandler(ChatHandler):
@@ -42,15 +73,43 @@ class ReplHandler(ChatHandler):
         """
         super().__init__(session_id, persona, markdown)
         
+        # A system prompt that changes between turns busts the provider prompt cache
+        self._sys_hash = _prompt_hash(self.persona.system_prompt)
+        
         # REPL-specific state
+        self._is_shell = self.persona.name == "shell"
         self.last_shell_command: Optional[str] = None
         self.multiline_mode = False
+        # Connection warm-up running while the user types
+        self._prefetch: Optional[asyncio.Task] = None
+        # Serializes session updates; a cancelled turn's worker may still be
+        # compacting the history when the next turn starts
+        self._session_lock = threading.Lock()
+        # Created on first use of the 'd' command
+        self._describe_handler: Optional[DefaultHandler] = None
         
-        # Setup prompt session
+        # Special commands by normalized input; e/d only exist for the shell persona
+        self._commands: Dict[str, Callable[..., None]] = {
+            "exit": self._cmd_exit,
+            "quit": self._cmd_exit,
+            "exit()": self._cmd_exit,
+            "quit()": self._cmd_exit,
+            "clear": self._cmd_clear,
+            "help": self._cmd_help,
+        }
+        if self._is_shell:
+            self._commands["e"] = self._cmd_exec
+            self._commands["d"] = self._cmd_describe
+        
+        # Setup prompt session; history persists across sessions, Up
+        # recalls entries starting with the typed text and Ctrl+R searches
+        history_path = Path(config.get("REPL_HISTORY_PATH"))
+        history_path.parent.mkdir(parents=True, exist_ok=True)
         self.prompt_session = PromptSession(
-            history=InMemoryHistory(),
+            history=FileHistory(str(history_path)),
             key_bindings=self._create_key_bindings(),
             multiline=False,
+            enable_history_search=True,
         )
     
     def _create_key_bindings(self) -> KeyBindings:
@@ -84,35 +143,7 @@ class ReplHandler(ChatHandler):
         self._show_welcome()
         
         try:
-            while True:
-                try:
-                    # Get user input
-                    prompt_text = self._get_prompt_text()
-                    user_input = self.prompt_session.prompt(prompt_text)
-                    
-                    # Handle empty input
-                    if not user_input.strip():
-                        continue
-                    
-                    # Handle special commands
-                    if self._handle_special_command(user_input, **validated_options):
-                        continue
-                    
-                    # Handle multiline input
-                    if user_input == '"""':
-                        user_input = self._get_multiline_input()
-                        if not user_input:
-                            continue
-                    
-                    # Process normal input
-                    self._process_input(user_input, **validated_options)
-                
-                except KeyboardInterrupt:
-                    console.print("\n[yellow]Use 'exit' or Ctrl+D to quit[/yellow]")
-                    continue
-                
-                except EOFError:
-                    break
+            asyncio.run(self._handle_async(**validated_options))
         
         except Exception as e:
             self.handle_error(e)
@@ -120,6 +151,100 @@ class ReplHandler(ChatHandler):
         finally:
             console.print("\n[dim]Goodbye![/dim]")
     
+    async def _handle_async(self, **options) -> None:
+        """
+        Run the REPL loop.
+        
+        Input is read with prompt_async, so the event loop keeps running
+        while the prompt is shown and output from background work is
+        printed above it.
+        
+        Args:
+            **options: Validated handler options
+        """
+        while True:
+            try:
+                # Get user input
+                prompt_text = self._get_prompt_text()
+                with patch_stdout(raw=True):
+                    user_input = await self.prompt_session.prompt_async(prompt_text)
+                
+                # Handle empty input
+                if not user_input.strip():
+                    continue
+                
+                # Handle special commands
+                if self._handle_special_command(user_input, **options):
+                    continue
+                
+                # Handle multiline input
+                if user_input == '"""':
+                    user_input = await self._get_multiline_input()
+                    if not user_input:
+                        continue
+                
+                # Process normal input
+                await self._aprocess_input(user_input, **options)
+            
+            except KeyboardInterrupt:
+                console.print("\n[yellow]Use 'exit' or Ctrl+D to quit[/yellow]")
+                continue
+            
+            except EOFError:
+                break
+    
+    async def _aprocess_input(self, user_input: str, **options) -> None:
+        """
+        Process user input on a worker thread so the event loop stays free.
+        
+        Ctrl+C stops a streaming response instead of ending the REPL. A
+        request still blocked on the network is abandoned: the prompt comes
+        back right away and the worker discards whatever it gets.
+        
+        Args:
+            user_input: User input to process
+            **options: Handler options
+        """
+        loop = asyncio.get_running_loop()
+        # One event per request, so an abandoned worker stays cancelled
+        interrupted = threading.Event()
+        cancelled = asyncio.Event()
+        
+        def on_sigint() -> None:
+            interrupted.set()
+            cancelled.set()
+        
+        try:
+            loop.add_signal_handler(signal.SIGINT, on_sigint)
+            handles_sigint = True
+        except (NotImplementedError, RuntimeError):
+            # No signal handler support (e.g. Windows event loops)
+            handles_sigint = False
+        
+        worker = asyncio.ensure_future(
+            asyncio.to_thread(self._process_input, user_input, interrupted, **options)
+        )
+        waiter = asyncio.ensure_future(cancelled.wait())
+        try:
+            await asyncio.wait({worker, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if not worker.done():
+                # A stream stops at its next chunk; a request stuck in the
+                # network or in retry backoff is not waited for
+                await asyncio.wait({worker}, timeout=_CANCEL_GRACE)
+        finally:
+            waiter.cancel()
+            if handles_sigint:
+                loop.remove_signal_handler(signal.SIGINT)
+        
+        if worker.done():
+            worker.result()
+        
+        if interrupted.is_set():
+            console.print("\n[yellow]Response cancelled[/yellow]")
+        elif self.last_shell_command and self._is_shell:
+            # 'd' or another prompt is likely next; have the connection ready
+            self._prefetch = asyncio.create_task(asyncio.to_thread(self.client.warm_connection))
+    
     def _show_welcome(self) -> None:
         """Display REPL welcome message."""
         welcome_text = f"""[bold cyan]DeepShell REPL[/bold cyan]
@@ -134,7 +259,7 @@ Persona: {self.persona.name}
   e             - Execute last shell command (shell persona only)
   d             - Describe last shell command (shell persona only)
 
-Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
+Press Ctrl+D to exit, Ctrl+C to cancel input, Ctrl+R to search history[/dim]
 """
         
         panel = Panel(
@@ -146,30 +271,26 @@ Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
     
     def _get_prompt_text(self) -> str:
         """Get prompt text for current state."""
-        if self.persona.name == "shell":
-            return "🐚 "
-        elif self.persona.name == "code" or self.persona.name == "coder":
-            return "💻 "
-        elif self.persona.name == "reasoning":
-            return "🧠 "
-        else:
-            return "🤖 "
+        return _PROMPT_GLYPHS.get(self.persona.name, "🤖 ")
     
-    def _get_multiline_input(self) -> str:
+    async def _get_multiline_input(self) -> str:
         """Get multiline input from user."""
-        console.print("[dim]Entering multiline mode. Type '\"\"\"' on a new line to finish.[/dim]")
+        console.print("[dim]Entering multiline mode. Press Alt+Enter (or Esc, Enter) to finish.[/dim]")
         
-        lines = []
-        while True:
-            try:
-                line = input()
-                if line.strip() == '"""':
-                    break
-                lines.append(line)
-            except (EOFError, KeyboardInterrupt):
-                console.print("\n[yellow]Multiline input cancelled[/yellow]")
-                return ""
+        try:
+            with patch_stdout(raw=True):
+                text = await self.prompt_session.prompt_async("... ", multiline=True)
+        except (EOFError, KeyboardInterrupt):
+            text = None
+        
+        if text is None:
+            console.print("\n[yellow]Multiline input cancelled[/yellow]")
+            return ""
         
+        # A closing '"""' line is still accepted
+        lines = text.split("\n")
+        if lines and lines[-1].strip() == '"""':
+            lines.pop()
         return "\n".join(lines)
     
     def _handle_special_command(self, user_input: str, **options) -> bool:
@@ -183,53 +304,61 @@ Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
         Returns:
             True if input was a special command, False otherwise
         """
-        command = user_input.strip().lower()
-        
-        # Exit commands
-        if command in ("exit", "quit", "exit()", "quit()"):
-            raise EOFError
-        
-        # Clear session
-        elif command == "clear":
+        command = self._commands.get(user_input.strip().lower())
+        if command is None:
+            return False
+        command(**options)
+        return True
+    
+    def _cmd_exit(self, **options) -> None:
+        """Exit the REPL."""
+        raise EOFError
+    
+    def _cmd_clear(self, **options) -> None:
+        """Clear session history, keeping the system message."""
+        # Pick up edits to the persona file; a different prompt busts the cache
+        current = get_persona_manager().load_persona(self.persona.name)
+        if current is not None:
+            self.persona = current
+        system_prompt = self.persona.system_prompt
+        if _prompt_hash(system_prompt) != self._sys_hash:
+            console.print(
+                f"[yellow]Warning: System prompt of persona '{self.persona.name}' changed "
+                "since the session started; provider prompt caching will miss.[/yellow]"
+            )
+            self._sys_hash = _prompt_hash(system_prompt)
+        with self._session_lock:
             self.session.clear()
             # Re-add system message
-            self.session.add_message("system", self.persona.system_prompt)
-            console.print("[green]✓ Session history cleared[/green]")
-            return True
-        
-        # Help command
-        elif command == "help":
-            self._show_help()
-            return True
-        
-        # Execute last shell command (shell persona only)
-        elif command == "e" and self.persona.name == "shell":
-            if self.last_shell_command:
-                try:
-                    run_shell_command(self.last_shell_command, interactive=True)
-                except Exception as e:
-                    console.print(f"[red]Error executing command: {e}[/red]")
-            else:
-                console.print("[yellow]No shell command to execute[/yellow]")
-            return True
-        
-        # Describe last shell command (shell persona only)
-        elif command == "d" and self.persona.name == "shell":
-            if self.last_shell_command:
-                # Switch to describe-shell persona temporarily
-                from ..persona import get_persona
-                describe_persona = get_persona("describe-shell")
-                
-                describe_prompt = f"Explain this shell command: {self.last_shell_command}"
-                
-                # Create temporary handler for description
-                temp_handler = ReplHandler("temp", describe_persona, self.markdown)
-                temp_handler._process_input(describe_prompt, **options)
-            else:
-                console.print("[yellow]No shell command to describe[/yellow]")
-            return True
-        
-        return False
+            self.session.add_message("system", system_prompt)
+        console.print("[green]✓ Session history cleared[/green]")
+    
+    def _cmd_help(self, **options) -> None:
+        """Show REPL help."""
+        self._show_help()
+    
+    def _cmd_exec(self, **options) -> None:
+        """Execute the last shell command (shell persona only)."""
+        if self.last_shell_command:
+            try:
+                run_shell_command(self.last_shell_command, interactive=True)
+            except Exception as e:
+                console.print(f"[red]Error executing command: {e}[/red]")
+        else:
+            console.print("[yellow]No shell command to execute[/yellow]")
+    
+    def _cmd_describe(self, **options) -> None:
+        """Describe the last shell command (shell persona only)."""
+        if self.last_shell_command:
+            # Switch to describe-shell persona temporarily
+            describe_prompt = f"Explain this shell command: {self.last_shell_command}"
+            
+            # One-shot description; no chat session or prompt needed
+            if self._describe_handler is None:
+                self._describe_handler = DefaultHandler(get_persona("describe-shell"), self.markdown)
+            self._describe_handler.handle(describe_prompt, **options)
+        else:
+            console.print("[yellow]No shell command to describe[/yellow]")
     
     def _show_help(self) -> None:
         """Show REPL help information."""
@@ -247,7 +376,7 @@ Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
 
 [cyan]Input Methods:[/cyan]
   • Single line: Type your prompt and press Enter
-  • Multi line: Type '\"\"\"', enter your text, then '\"\"\"' on a new line
+  • Multi line: Type '\"\"\"', enter your text, then press Alt+Enter
   • Cancel: Press Ctrl+C to cancel current input
   • Exit: Press Ctrl+D or type 'exit' to quit
 
@@ -264,17 +393,24 @@ Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
         )
         console.print(panel)
     
-    def _process_input(self, user_input: str, **options) -> None:
+    def _process_input(self, user_input: str, interrupted: threading.Event, **options) -> None:
         """
         Process user input and generate response.
         
+        A cancelled reply is neither printed, kept in the session nor
+        offered as a shell command.
+        
         Args:
             user_input: User input to process
+            interrupted: Set when the user cancels the response
             **options: Handler options
         """
         try:
             # Create messages with history
-            messages = self.make_messages(user_input)
+            with self._session_lock:
+                messages = self.make_messages(user_input, options.get("model"))
+            if interrupted.is_set():
+                return
             
             # Get response
             if options["stream"]:
@@ -284,13 +420,18 @@ Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
                     **options
                 )
                 
-                full_response = self.stream_response(response_generator)
+                full_response = self.stream_response(
+                    _until(interrupted, response_generator)
+                )
+                if interrupted.is_set():
+                    return
                 
                 # Add assistant response to session
-                self.session.add_message("assistant", full_response)
+                with self._session_lock:
+                    self.session.add_message("assistant", full_response)
                 
                 # Store shell command if applicable
-                if self.persona.name == "shell":
+                if self._is_shell:
                     self.last_shell_command = full_response.strip()
             
             else:
@@ -299,32 +440,35 @@ Press Ctrl+D to exit, Ctrl+C to cancel input[/dim]
                     messages=messages,
                     **options
                 )
+                if interrupted.is_set():
+                    return
                 
                 content = response.choices[0].message.content
                 self.print_response(content)
                 
                 # Add assistant response to session
-                self.session.add_message("assistant", content)
+                with self._session_lock:
+                    self.session.add_message("assistant", content)
                 
                 # Store shell command if applicable
-                if self.persona.name == "shell":
+                if self._is_shell:
                     self.last_shell_command = content.strip()
         
         except Exception as e:
             self.handle_error(e)
     
-    def make_messages(self, prompt: str) -> List[Dict[str, str]]:
+    def make_messages(self, prompt: str, model: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Create message list including conversation history.
         
+        Older turns are compacted into a checkpoint once the history
+        nears the model's context window.
+        
         Args:
             prompt: User prompt
+            model: Model the messages are sent to
             
         Returns:
             List of messages including history and new prompt
         """
-        # Add user message to session
-        self.session.add_message("user", prompt)
-        
-        # Return all messages for API call
-        return self.session.get_messages()
+        return super().make_messages(prompt, model)
@@ -4,41 +4,140 @@ OpenAI LLM client integration using LiteLLM.
 This module provides a unified interface for interacting with OpenAI language models.
 """
 
+import asyncio
 import json
+import logging
 import os
 import time
+from functools import lru_cache
 from typing import Any, Dict, Generator, List, Optional, Union
 from abc import ABC, abstractmethod
 
-import litellm
-from litellm import completion
-from rich.console import Console
-
+from ._console import console
+from .cache import cache_completion
 from .config import config
 
-console = Console()
 
-# Configure LiteLLM
-litellm.suppress_debug_info = True
-litellm.drop_params = True  # Drop unsupported parameters
+logger = logging.getLogger(__name__)
+_log_level = logging.getLevelName(str(config.get("LOG_LEVEL")).upper())
+if isinstance(_log_level, int):
+    logger.setLevel(_log_level)
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    logger.addHandler(_log_handler)
+
+
+@lru_cache(maxsize=1)
+def _get_http_client() -> Any:
+    """
+    Get the HTTP client shared by all requests, so connections are reused.
+
+    Retries and follow-up calls reuse a kept-alive connection instead of
+    paying a new TLS handshake. HTTP/2 is used when the optional h2 package
+    is installed.
+    """
+    import httpx
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    return httpx.Client(
+        http2=http2,
+        timeout=config.get("REQUEST_TIMEOUT"),
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_litellm() -> Any:
+    """Import and configure LiteLLM on first use; importing it is slow."""
+    import litellm
+
+    litellm.suppress_debug_info = True
+    litellm.drop_params = True  # Drop unsupported parameters
+    litellm.client_session = _get_http_client()
+    return litellm
+
+
+# Streamed deltas are yielded once this many characters have accumulated
+# or this many seconds have passed since the last yield
+_STREAM_FLUSH_SIZE = 64
+_STREAM_FLUSH_INTERVAL = 0.03
+
+# Extra keyword arguments forwarded to LiteLLM; handler options are dropped
+_VALID_KEYS = frozenset({
+    "model", "messages", "temperature", "top_p", "stream", "timeout", "max_tokens", "tools", "tool_choice"
+})
 
 
 class MockResponse:
     """Mock response object for error handling."""
+    __slots__ = ("choices",)
+
     def __init__(self, content: str):
         self.choices = [MockChoice(content)]
 
 class MockChoice:
     """Mock choice object for error handling."""
+    __slots__ = ("message",)
+
     def __init__(self, content: str):
         self.message = MockMessage(content)
 
 class MockMessage:
     """Mock message object for error handling."""
+    __slots__ = ("content",)
+
     def __init__(self, content: str):
         self.content = content
 
 
+def cache_breakpoint(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of a text message marked as a provider prompt-cache breakpoint.
+
+    Messages without plain string content are returned unchanged. Providers
+    without explicit cache control have the marker stripped by LiteLLM.
+    """
+    if not isinstance(message.get("content"), str):
+        return message
+    return {
+        **message,
+        "content": [{
+            "type": "text",
+            "text": message["content"],
+            "cache_control": {"type": "ephemeral"},
+        }],
+    }
+
+
+def _mark_cacheable(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mark a leading system message as a provider prompt-cache breakpoint.
+
+    Returns a new list; the caller's messages are not modified.
+    """
+    if messages[0].get("role") != "system":
+        return messages
+    return [cache_breakpoint(messages[0]), *messages[1:]]
+
+
+def _log_cache_usage(response: Any) -> None:
+    """Log how many prompt tokens the provider served from its cache."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    cached = getattr(usage, "cache_read_input_tokens", None)
+    if cached is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+    if cached is not None:
+        logger.debug("Prompt cache: %s of %s input tokens cached", cached, getattr(usage, "prompt_tokens", "?"))
+
+
 class BaseLLMClient(ABC):
     """Base class for all LLM clients."""
 
@@ -60,6 +159,31 @@ class BaseLLMClient(ABC):
     def get_default_model(self) -> str:
         pass
 
+    def get_context_window(self, model: str) -> int:
+        """Input token limit of a model, conservative for unknown models."""
+        return 8192
+
+    def get_api_base(self) -> Optional[str]:
+        """Base URL of the provider API, if known."""
+        return None
+
+    def warm_connection(self) -> None:
+        """
+        Open a pooled connection to the API ahead of the next request.
+
+        The DNS lookup and TLS handshake are then already done when the
+        request is sent. Failures are ignored; the request will retry them.
+        """
+        api_base = self.get_api_base()
+        if not api_base:
+            return
+        import httpx
+
+        try:
+            _get_http_client().head(api_base, timeout=5)
+        except httpx.HTTPError as e:
+            logger.debug("Connection warm-up failed: %s", e)
+
     def validate_model(self, model: str) -> bool:
         available_models = self.get_available_models()
         return model in available_models
@@ -71,29 +195,35 @@ class BaseLLMClient(ABC):
         last_exception = None
         for attempt in range(self.max_retries + 1):
             try:
-                result = func(*args, **kwargs)
-                if result is None:
-                    raise ValueError("API returned None response")
-                if isinstance(result, bool):
-                    raise ValueError(f"API returned boolean: {result}")
-                if not kwargs.get('stream', False):
-                    if not hasattr(result, 'choices'):
-                        raise ValueError("API response missing 'choices' attribute")
-                    if not result.choices:
-                        raise ValueError("API response has empty choices")
-                return result
+                return func(*args, **kwargs)
             except Exception as e:
                 last_exception = e
-                console.print(f"DEBUG: Exception in attempt {attempt + 1}: {str(e)}")
+                logger.debug("Exception in attempt %d: %s", attempt + 1, e)
                 if attempt == self.max_retries:
                     break
                 delay = self.retry_delay * (2 ** attempt)
                 console.print(f"[yellow]Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s...[/yellow]")
                 time.sleep(delay)
-        console.print(f"DEBUG: All retries failed, raising: {str(last_exception)}")
+        logger.debug("All retries failed: %s", last_exception)
         return self._create_error_response(str(last_exception))
 
-    def complete(
+    async def _aretry_with_backoff(self, func, *args, **kwargs) -> Any:
+        last_exception = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                last_exception = e
+                logger.debug("Exception in attempt %d: %s", attempt + 1, e)
+                if attempt == self.max_retries:
+                    break
+                delay = self.retry_delay * (2 ** attempt)
+                console.print(f"[yellow]Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s...[/yellow]")
+                await asyncio.sleep(delay)
+        logger.debug("All retries failed: %s", last_exception)
+        return self._create_error_response(str(last_exception))
+
+    def _completion_kwargs(
         self,
         messages: List[Dict[str, str]],
         model: Optional[str] = None,
@@ -103,11 +233,11 @@ class BaseLLMClient(ABC):
         stream: bool = False,
         functions: Optional[List[Dict[str, Any]]] = None,
         **kwargs
-    ) -> Union[Any, Generator[str, None, None]]:
+    ) -> Dict[str, Any]:
         model_name = model or self.get_default_model()
-        valid_keys = {
-            "model", "messages", "temperature", "top_p", "stream", "timeout", "max_tokens", "tools", "tool_choice"
-        }
+        prompt_cache = config.get("PROMPT_CACHE") in (True, "true")
+        if prompt_cache and messages:
+            messages = _mark_cacheable(messages)
         completion_kwargs = {
             "model": model_name,
             "messages": messages,
@@ -122,32 +252,96 @@ class BaseLLMClient(ABC):
             completion_kwargs["tools"] = [
                 {"type": "function", "function": func} for func in functions
             ]
+            if prompt_cache:
+                # Cache the tool definitions along with the system prompt
+                completion_kwargs["tools"][-1]["cache_control"] = {"type": "ephemeral"}
             completion_kwargs["tool_choice"] = "auto"
-        for k, v in kwargs.items():
-            if k in valid_keys:
-                completion_kwargs[k] = v
+        passthrough = kwargs.keys() & _VALID_KEYS
+        if passthrough:
+            completion_kwargs.update({k: kwargs[k] for k in passthrough})
+        return completion_kwargs
+
+    @cache_completion(MockResponse, _VALID_KEYS)
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        top_p: float = 1.0,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        functions: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> Union[Any, Generator[str, None, None]]:
+        completion_kwargs = self._completion_kwargs(
+            messages, model, temperature, top_p, max_tokens, stream, functions, **kwargs
+        )
         if stream:
             return self._stream_completion(**completion_kwargs)
         else:
-            return self._retry_with_backoff(completion, **completion_kwargs)
+            response = self._retry_with_backoff(_get_litellm().completion, **completion_kwargs)
+            _log_cache_usage(response)
+            return response
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        top_p: float = 1.0,
+        max_tokens: Optional[int] = None,
+        functions: Optional[List[Dict[str, Any]]] = None,
+        **kwargs
+    ) -> Any:
+        """Non-streaming completion that awaits the request instead of blocking."""
+        kwargs.pop("stream", None)
+        completion_kwargs = self._completion_kwargs(
+            messages, model, temperature, top_p, max_tokens, False, functions, **kwargs
+        )
+        response = await self._aretry_with_backoff(_get_litellm().acompletion, **completion_kwargs)
+        _log_cache_usage(response)
+        return response
 
     def _stream_completion(self, **kwargs) -> Generator[str, None, None]:
+        buf: List[str] = []
+        size = 0
         try:
-            stream = self._retry_with_backoff(completion, **kwargs)
+            stream = self._retry_with_backoff(_get_litellm().completion, **kwargs)
             if not hasattr(stream, '__iter__'):
                 yield f"❌ Streaming Error: {getattr(stream, 'content', str(stream))}"
                 return
+            # Coalesce token-sized deltas so consumers render fewer, larger pieces
+            last_flush = time.monotonic()
             for chunk in stream:
-                if hasattr(chunk, 'choices') and chunk.choices:
+                # Hot loop: direct attribute access, misses are the rare path
+                try:
                     delta = chunk.choices[0].delta
-                    if hasattr(delta, 'content') and delta.content:
-                        yield delta.content
-                    elif hasattr(delta, 'tool_calls') and delta.tool_calls:
-                        for tool_call in delta.tool_calls:
-                            if tool_call.function.name:
-                                yield f"\n🔧 Calling function: {tool_call.function.name}\n"
+                    content = delta.content
+                except (AttributeError, IndexError):
+                    continue
+                if not content:
+                    tool_calls = getattr(delta, 'tool_calls', None)
+                    if not tool_calls:
+                        continue
+                    content = "".join(
+                        f"\n🔧 Calling function: {tool_call.function.name}\n"
+                        for tool_call in tool_calls
+                        if tool_call.function.name
+                    )
+                buf.append(content)
+                size += len(content)
+                now = time.monotonic()
+                if size >= _STREAM_FLUSH_SIZE or now - last_flush >= _STREAM_FLUSH_INTERVAL:
+                    yield "".join(buf)
+                    buf.clear()
+                    size = 0
+                    last_flush = now
+            if buf:
+                yield "".join(buf)
         except Exception as e:
             console.print(f"[red]Streaming error: {str(e)}[/red]")
+            if buf:
+                yield "".join(buf)
             yield f"❌ Streaming Error: {str(e)}"
 
     def chat(
@@ -164,25 +358,53 @@ class BaseLLMClient(ABC):
             response = self.complete(messages, **kwargs)
             if kwargs.get("stream", False):
                 return response
-            else:
-                if not response or not hasattr(response, 'choices'):
-                    return self._create_error_response("Invalid API response structure")
-                if not response.choices:
-                    return self._create_error_response("Empty choices in API response")
-                if not hasattr(response.choices[0], 'message'):
-                    return self._create_error_response("Invalid message structure in API response")
-                if not hasattr(response.choices[0].message, 'content'):
-                    return self._create_error_response("No content in API response message")
-                return response
+            try:
+                response.choices[0].message.content
+            except (AttributeError, IndexError, TypeError) as e:
+                return self._create_error_response(f"Invalid API response structure: {e}")
+            return response
         except Exception as e:
             console.print(f"[red]Chat error: {str(e)}[/red]")
             return self._create_error_response(f"Chat failed: {str(e)}")
 
+    def _provider_name(self) -> str:
+        return self.get_model_prefix().rstrip("/")
+
+    async def asubmit_batch(self, requests: bytes) -> Any:
+        """Upload a JSONL request file and start a batch job for it."""
+        batch_file = await _get_litellm().acreate_file(
+            file=("batch.jsonl", requests),
+            purpose="batch",
+            custom_llm_provider=self._provider_name(),
+        )
+        return await _get_litellm().acreate_batch(
+            completion_window="24h",
+            endpoint="/v1/chat/completions",
+            input_file_id=batch_file.id,
+            custom_llm_provider=self._provider_name(),
+        )
+
+    async def aretrieve_batch(self, batch_id: str) -> Any:
+        """Get the current state of a batch job."""
+        return await _get_litellm().aretrieve_batch(
+            batch_id=batch_id,
+            custom_llm_provider=self._provider_name(),
+        )
+
+    async def abatch_output(self, file_id: str) -> bytes:
+        """Download the JSONL output of a finished batch job."""
+        content = await _get_litellm().afile_content(
+            file_id=file_id,
+            custom_llm_provider=self._provider_name(),
+        )
+        return content.content
+
     def test_connection(self) -> bool:
         try:
             response = self.complete(
                 messages=[{"role": "user", "content": "Hello"}],
-                max_tokens=10
+                max_tokens=10,
+                cache=False,
             )
             if not response or not hasattr(response, 'choices') or not response.choices:
                 return False
@@ -197,6 +419,22 @@ class BaseLLMClient(ABC):
 class OpenAIClient(BaseLLMClient):
     """OpenAI LLM client."""
 
+    _MODELS = (
+        "gpt-3.5-turbo",
+        "gpt-4",
+        "gpt-4-turbo",
+        "gpt-4o",
+        "gpt-4o-mini",
+    )
+    _MODEL_SET = frozenset(_MODELS)
+    _CONTEXT_WINDOWS = {
+        "gpt-3.5-turbo": 16385,
+        "gpt-4": 8192,
+        "gpt-4-turbo": 128000,
+        "gpt-4o": 128000,
+        "gpt-4o-mini": 128000,
+    }
+
     def __init__(self, api_key: Optional[str] = None, **kwargs):
         super().__init__(api_key, **kwargs)
         self.api_key = api_key or config.get("OPENAI_API_KEY")
@@ -212,13 +450,16 @@ class OpenAIClient(BaseLLMClient):
         return "openai/"
 
     def get_available_models(self) -> List[str]:
-        return [
-            "gpt-3.5-turbo",
-            "gpt-4",
-            "gpt-4-turbo",
-            "gpt-4o",
-            "gpt-4o-mini"
-        ]
+        return list(self._MODELS)
+
+    def validate_model(self, model: str) -> bool:
+        return model in self._MODEL_SET
+
+    def get_context_window(self, model: str) -> int:
+        return self._CONTEXT_WINDOWS.get(model, 8192)
+
+    def get_api_base(self) -> Optional[str]:
+        return config.get("API_BASE_URL") or "https://api.openai.com/v1"
 
     def get_default_model(self) -> str:
         return "gpt-3.5-turbo"
@@ -229,16 +470,21 @@ PROVIDERS = {
     "openai": OpenAIClient,
 }
 
+# Client settings, read once; call reset_config_cache() after changing them
+_PROVIDER = config.get("PROVIDER", "openai")
+_TIMEOUT = config.get("REQUEST_TIMEOUT", 60)
+_RETRIES = config.get("MAX_RETRIES", 3)
+
 
 def get_client(provider: Optional[str] = None) -> BaseLLMClient:
     """Get LLM client for OpenAI."""
-    provider_name = provider or config.get("PROVIDER", "openai")
+    provider_name = provider or _PROVIDER
     if provider_name != "openai":
         raise ValueError("Only 'openai' provider is supported in this version.")
     client_class = PROVIDERS[provider_name]
     return client_class(
-        timeout=config.get("REQUEST_TIMEOUT", 60),
-        max_retries=config.get("MAX_RETRIES", 3),
+        timeout=_TIMEOUT,
+        max_retries=_RETRIES,
     )
 
 
@@ -260,7 +506,7 @@ _current_provider: Optional[str] = None
 def get_global_client(provider: Optional[str] = None) -> BaseLLMClient:
     """Get or create global client instance."""
     global _client, _current_provider
-    provider_name = provider or config.get("PROVIDER", "openai")
+    provider_name = provider or _PROVIDER
     if provider_name != "openai":
         raise ValueError("Only 'openai' provider is supported in this version.")
     if _client is None or _current_provider != provider_name:
@@ -274,3 +520,12 @@ def reset_client() -> None:
     global _client, _current_provider
     _client = None
     _current_provider = None
+
+
+def reset_config_cache() -> None:
+    """Re-read client settings from configuration and drop the global client."""
+    global _PROVIDER, _TIMEOUT, _RETRIES
+    _PROVIDER = config.get("PROVIDER", "openai")
+    _TIMEOUT = config.get("REQUEST_TIMEOUT", 60)
+    _RETRIES = config.get("MAX_RETRIES", 3)
+    reset_client()
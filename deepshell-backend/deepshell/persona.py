@@ -4,23 +4,38 @@ Persona system for DeepShell.
 
 Manages AI personas (roles) that define system prompts and behavior
 patterns for different use cases like shell commands, coding, etc.
+
+System prompts must render to the same bytes on every call: providers cache
+the prompt prefix, and a single changing byte makes every turn a cache miss.
+Never put per-turn values such as {date}, {time} or {session_id} in a
+persona prompt; pass them in the user message instead.
 """
 
-import json
 import os
 import platform
-import subprocess
+import re
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
-
-from rich.console import Console
-from rich.panel import Panel
-from rich.prompt import Prompt
-from rich.table import Table
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from ._console import console
+from ._json import dumps, loads
 from .config import config
+from .utils import parent_process_name, read_os_release
 
-console = Console()
+# Marks a persona directory whose built-ins were written; bump the version
+# when built-in personas are added so existing directories pick them up
+_BUILTINS_SENTINEL = ".builtins_v1"
+
+# Splits a template into alternating literal text and {variable} names
+_VARIABLE_RE = re.compile(r"\{([^{}]+)\}")
+
+
+class _SafeDict(dict):
+    """Template values that leave unknown {placeholders} untouched."""
+    
+    def __missing__(self, key: str) -> str:
+        return f"{{{key}}}"
 
 
 class Persona:
@@ -52,21 +67,64 @@ class Persona:
         self.description = description
         self.variables = variables or {}
     
+    @property
+    def prompt(self) -> str:
+        """System prompt template."""
+        return self._prompt
+    
+    @prompt.setter
+    def prompt(self, prompt: str) -> None:
+        self._prompt = prompt
+        # Compiled once: literal text at even indexes, variable names at odd
+        self._segments = _VARIABLE_RE.split(prompt)
+        self._has_vars = len(self._segments) > 1
+        # Plain {name} placeholders and no other braces: str.format_map
+        # renders it identically in a single C-level pass
+        self._formattable = all(
+            segment.isidentifier() if i % 2 else "{" not in segment and "}" not in segment
+            for i, segment in enumerate(self._segments)
+        )
+        self._rendered: Optional[str] = None
+        # Checked on the template so handlers don't render the prompt
+        self.apply_markdown = "APPLY MARKDOWN" in prompt
+    
+    @property
+    def variables(self) -> Dict[str, str]:
+        """Custom template variables; assign a new dict to change them."""
+        return self._variables
+    
+    @variables.setter
+    def variables(self, variables: Dict[str, str]) -> None:
+        self._variables = variables
+        self._rendered = None
+    
     @property
     def system_prompt(self) -> str:
-        """Get system prompt with variables substituted."""
-        prompt = self.prompt
-        
-        # Substitute built-in variables
-        built_in_vars = self._get_built_in_variables()
-        for key, value in built_in_vars.items():
-            prompt = prompt.replace(f"{{{key}}}", value)
-        
-        # Substitute custom variables
-        for key, value in self.variables.items():
-            prompt = prompt.replace(f"{{{key}}}", value)
+        """
+        Get system prompt with variables substituted.
+
+        Only stable variables are substituted, so the result is byte-identical
+        across calls within a session. It is rendered once and reused until
+        prompt or variables is reassigned.
+        """
+        # Nothing to substitute, so skip OS and shell detection entirely
+        if not self._has_vars:
+            return self._prompt
         
-        return prompt
+        if self._rendered is None:
+            # Built-in variables take precedence over custom ones
+            values = _SafeDict(self._variables, **self._get_built_in_variables())
+            if self._formattable:
+                self._rendered = self._prompt.format_map(values)
+                return self._rendered
+            
+            segments = self._segments
+            parts = segments[:]
+            for i in range(1, len(segments), 2):
+                name = segments[i]
+                parts[i] = values[name]
+            self._rendered = "".join(parts)
+        return self._rendered
     
     def _get_built_in_variables(self) -> Dict[str, str]:
         """Get built-in template variables."""
@@ -88,14 +146,7 @@ class Persona:
             return "macOS"
         elif system == "linux":
             # Try to get distribution info
-            try:
-                with open("/etc/os-release", "r") as f:
-                    for line in f:
-                        if line.startswith("PRETTY_NAME="):
-                            return line.split("=", 1)[1].strip().strip('"')
-            except FileNotFoundError:
-                pass
-            return "Linux"
+            return read_os_release() or "Linux"
         elif system == "windows":
             return "Windows"
         else:
@@ -113,19 +164,7 @@ class Persona:
             return os.path.basename(shell)
         
         # Fallback detection
-        try:
-            result = subprocess.run(
-                ["ps", "-p", str(os.getppid()), "-o", "comm="],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-        
-        return "bash"  # Default fallback
+        return parent_process_name(os.getppid()) or "bash"  # Default fallback
     
     def to_dict(self) -> Dict[str, any]:
         """Convert persona to dictionary for serialization."""
@@ -147,28 +186,11 @@ class Persona:
         )
 
 
-class PersonaManager:
-    """Manages persona storage and retrieval."""
-    
-    def __init__(self, storage_path: Path) -> None:
-        """
-        Initialize persona manager.
-        
-        Args:
-            storage_path: Directory to store persona files
-        """
-        self.storage_path = Path(storage_path)
-        self.storage_path.mkdir(parents=True, exist_ok=True)
-        
-        # Initialize built-in personas if they don't exist
-        self._initialize_built_in_personas()
-    
-    def _initialize_built_in_personas(self) -> None:
-        """Create built-in personas if they don't exist."""
-        built_in_personas = {
-            "default": Persona(
-                name="default",
-                prompt="""You are DeepShell, an AI assistant powered by Deepshell LLM.
+# Built-in personas, written to the persona directory on first run
+_BUILT_IN_SPECS: Dict[str, Dict[str, str]] = {
+    "default": {
+        "name": "default",
+        "prompt": """You are DeepShell, an AI assistant powered by Deepshell LLM.
 You are a programming and system administration assistant managing {os} with {shell} shell.
 
 Key guidelines:
@@ -179,12 +201,12 @@ Key guidelines:
 - If you need clarification, ask specific questions
 
 Current environment: {os} with {shell} shell""",
-                description="General-purpose AI assistant for programming and system administration"
-            ),
-            
-            "shell": Persona(
-                name="shell",
-                prompt="""You are a shell command generator for {os} using {shell}.
+        "description": "General-purpose AI assistant for programming and system administration"
+    },
+
+    "shell": {
+        "name": "shell",
+        "prompt": """You are a shell command generator for {os} using {shell}.
 
 CRITICAL RULES:
 - Provide ONLY shell commands without any description or explanation
@@ -197,12 +219,12 @@ CRITICAL RULES:
 
 Operating System: {os}
 Shell: {shell}""",
-                description="Generates shell commands without explanations"
-            ),
-            
-            "describe-shell": Persona(
-                name="describe-shell",
-                prompt="""You are a shell command explainer for {os} using {shell}.
+        "description": "Generates shell commands without explanations"
+    },
+
+    "describe-shell": {
+        "name": "describe-shell",
+        "prompt": """You are a shell command explainer for {os} using {shell}.
 
 Your role:
 - Explain what shell commands do in clear, simple terms
@@ -214,12 +236,12 @@ Your role:
 
 Operating System: {os}
 Shell: {shell}""",
-                description="Explains shell commands and their functionality"
-            ),
-            
-            "code": Persona(
-                name="code",
-                prompt="""You are a code generator that provides ONLY code as output.
+        "description": "Explains shell commands and their functionality"
+    },
+
+    "code": {
+        "name": "code",
+        "prompt": """You are a code generator that provides ONLY code as output.
 
 CRITICAL RULES:
 - Provide ONLY code without any description or explanation
@@ -231,12 +253,12 @@ CRITICAL RULES:
 - Ensure code is syntactically correct and functional
 
 Provide clean, working code without any additional text.""",
-                description="Generates code without explanations or formatting"
-            ),
-            
-            "reasoning": Persona(
-                name="reasoning",
-                prompt="""You are DeepShell in reasoning mode, powered by DeepShell's reasoning capabilities.
+        "description": "Generates code without explanations or formatting"
+    },
+
+    "reasoning": {
+        "name": "reasoning",
+        "prompt": """You are DeepShell in reasoning mode, powered by DeepShell's reasoning capabilities.
 
 Your approach:
 - Think through problems step by step
@@ -254,12 +276,12 @@ When solving problems:
 5. Mention any assumptions or limitations
 
 Current environment: {os} with {shell} shell""",
-                description="Uses step-by-step reasoning for complex problems"
-            ),
-            
-            "coder": Persona(
-                name="coder",
-                prompt="""You are DeepShell in coding mode, specialized for programming tasks.
+        "description": "Uses step-by-step reasoning for complex problems"
+    },
+
+    "coder": {
+        "name": "coder",
+        "prompt": """You are DeepShell in coding mode, specialized for programming tasks.
 
 Your expertise:
 - Write clean, efficient, and well-documented code
@@ -277,14 +299,50 @@ Coding principles:
 - Suggest improvements and optimizations
 
 Current environment: {os} with {shell} shell""",
-                description="Specialized for programming and software development tasks"
-            ),
-        }
+        "description": "Specialized for programming and software development tasks"
+    },
+}
+
+
+class PersonaManager:
+    """Manages persona storage and retrieval."""
+    
+    def __init__(self, storage_path: Path) -> None:
+        """
+        Initialize persona manager.
+        
+        Args:
+            storage_path: Directory to store persona files
+        """
+        self.storage_path = Path(storage_path)
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+        
+        # Loaded personas with the file mtime they were parsed at
+        self._cache: Dict[str, Tuple[int, Persona]] = {}
+        
+        # Initialize built-in personas if they don't exist
+        self._initialize_built_in_personas()
+    
+    def _initialize_built_in_personas(self) -> None:
+        """
+        Create built-in personas if they don't exist.
+        
+        A sentinel file marks the storage as populated, so warm starts skip
+        building the personas and probing their files.
+        """
+        sentinel = self.storage_path / _BUILTINS_SENTINEL
+        if sentinel.exists():
+            return
         
-        for persona_name, persona in built_in_personas.items():
+        for persona_name, spec in _BUILT_IN_SPECS.items():
             persona_file = self.storage_path / f"{persona_name}.json"
             if not persona_file.exists():
-                self.save_persona(persona)
+                self.save_persona(Persona(**spec))
+        
+        try:
+            sentinel.touch()
+        except OSError:
+            pass
     
     def get_persona_file(self, name: str) -> Path:
         """Get file path for persona."""
@@ -293,31 +351,74 @@ Current environment: {os} with {shell} shell""",
     def save_persona(self, persona: Persona) -> None:
         """Save persona to file."""
         persona_file = self.get_persona_file(persona.name)
+        self._cache.pop(persona.name, None)
         try:
-            with open(persona_file, 'w', encoding='utf-8') as f:
-                json.dump(persona.to_dict(), f, indent=2, ensure_ascii=False)
+            persona_file.write_bytes(dumps(persona.to_dict(), indent=True))
         except IOError as e:
             console.print(f"[red]Error saving persona '{persona.name}': {e}[/red]")
     
     def load_persona(self, name: str) -> Optional[Persona]:
-        """Load persona from file."""
+        """
+        Load persona from file.
+        
+        Parsed personas are reused until the file's mtime changes, so
+        repeated loads cost one stat() instead of a read and JSON parse.
+        """
         persona_file = self.get_persona_file(name)
         
-        if not persona_file.exists():
+        try:
+            mtime = persona_file.stat().st_mtime_ns
+        except OSError:
+            self._cache.pop(name, None)
             return None
         
+        return self._load_cached(name, persona_file, mtime)
+    
+    def _load_cached(self, name: str, persona_file: Path, mtime: int) -> Optional[Persona]:
+        """Return the cached persona if it is current, else parse the file."""
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
         try:
-            with open(persona_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return Persona.from_dict(data)
-        except (IOError, json.JSONDecodeError, KeyError) as e:
+            persona = Persona.from_dict(loads(persona_file.read_bytes()))
+            self._cache[name] = (mtime, persona)
+            return persona
+        except (IOError, ValueError, KeyError) as e:
             console.print(f"[red]Error loading persona '{name}': {e}[/red]")
             return None
     
+    def _scan(self) -> List[Tuple[str, os.DirEntry]]:
+        """Scan the storage directory for persona files, sorted by name."""
+        try:
+            with os.scandir(self.storage_path) as it:
+                return sorted(
+                    (entry.name[:-5], entry)
+                    for entry in it
+                    if entry.name.endswith(".json") and entry.is_file()
+                )
+        except OSError:
+            return []
+    
     def list_personas(self) -> List[str]:
         """List all available persona names."""
-        persona_files = self.storage_path.glob("*.json")
-        return sorted([f.stem for f in persona_files])
+        return [name for name, _ in self._scan()]
+    
+    def iter_personas(self) -> Iterator[Tuple[str, Optional[Persona]]]:
+        """
+        Yield (name, persona) for every stored persona, sorted by name.
+        
+        Uses a single directory scan; the mtimes come from the scan entries
+        and unchanged personas are served from the cache without any reads.
+        The persona is None if its file could not be loaded.
+        """
+        for name, entry in self._scan():
+            try:
+                mtime = entry.stat().st_mtime_ns
+            except OSError:
+                yield name, None
+                continue
+            yield name, self._load_cached(name, Path(entry.path), mtime)
     
     def delete_persona(self, name: str) -> bool:
         """Delete persona file."""
@@ -326,6 +427,7 @@ Current environment: {os} with {shell} shell""",
         if not persona_file.exists():
             return False
         
+        self._cache.pop(name, None)
         try:
             persona_file.unlink()
             return True
@@ -336,14 +438,21 @@ Current environment: {os} with {shell} shell""",
 
 # Global persona manager
 _persona_manager: Optional[PersonaManager] = None
+_persona_manager_lock = threading.Lock()
 
 
 def get_persona_manager() -> PersonaManager:
-    """Get or create global persona manager."""
+    """
+    Get or create global persona manager.
+    
+    Safe to call from several threads; the manager is created exactly once.
+    """
     global _persona_manager
     
     if _persona_manager is None:
-        _persona_manager = PersonaManager(config.get("PERSONA_STORAGE_PATH"))
+        with _persona_manager_lock:
+            if _persona_manager is None:
+                _persona_manager = PersonaManager(config.get("PERSONA_STORAGE_PATH"))
     
     return _persona_manager
 
@@ -370,6 +479,8 @@ def get_persona(name: str) -> Persona:
 
 def create_persona(name: str) -> None:
     """Interactive persona creation."""
+    from rich.prompt import Prompt
+    
     manager = get_persona_manager()
     
     # Check if persona already exists
@@ -413,6 +524,8 @@ def create_persona(name: str) -> None:
 
 def show_persona(name: str) -> None:
     """Display persona details."""
+    from rich.panel import Panel
+    
     persona = get_persona_manager().load_persona(name)
     
     if persona is None:
@@ -439,10 +552,12 @@ def show_persona(name: str) -> None:
 
 def list_personas() -> None:
     """Display all available personas."""
+    from rich.table import Table
+    
     manager = get_persona_manager()
-    persona_names = manager.list_personas()
+    personas = list(manager.iter_personas())
     
-    if not persona_names:
+    if not personas:
         console.print("[yellow]No personas found[/yellow]")
         return
     
@@ -450,8 +565,7 @@ def list_personas() -> None:
     table.add_column("Name", style="green")
     table.add_column("Description", style="white")
     
-    for name in persona_names:
-        persona = manager.load_persona(name)
+    for name, persona in personas:
         description = persona.description if persona else "Error loading persona"
         table.add_row(name, description)
     
@@ -460,6 +574,8 @@ def list_personas() -> None:
 
 def delete_persona(name: str) -> None:
     """Delete a persona."""
+    from rich.prompt import Prompt
+    
     manager = get_persona_manager()
     
     if not manager.get_persona_file(name).exists():
@@ -467,8 +583,7 @@ def delete_persona(name: str) -> None:
         return
     
     # Prevent deletion of built-in personas
-    built_in_personas = ["default", "shell", "describe-shell", "code", "reasoning", "coder"]
-    if name in built_in_personas:
+    if name in _BUILT_IN_SPECS:
         console.print(f"[red]Error: Cannot delete built-in persona '{name}'[/red]")
         return
     
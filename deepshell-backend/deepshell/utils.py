@@ -5,19 +5,22 @@ Provides helper functions for shell integration, file operations,
 input handling, and system detection.
 """
 
+import atexit
 import os
 import platform
+import re
+import struct
 import subprocess
 import sys
 import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
-from rich.console import Console
-from rich.prompt import Confirm, Prompt
-from rich.syntax import Syntax
+from ._console import console
 
-console = Console()
+# OpenAI API keys start with 'sk-' and are at least 20 characters long
+_API_KEY_RE = re.compile(r"sk-[A-Za-z0-9_\-]{17,}")
 
 
 def detect_stdin() -> bool:
@@ -30,6 +33,45 @@ def detect_stdin() -> bool:
     return not sys.stdin.isatty()
 
 
+def read_stdin() -> str:
+    """
+    Read all piped stdin content.
+
+    Reads the binary buffer and decodes once; streams without one
+    (such as test runners' replacements) are read as text.
+
+    Returns:
+        Stdin content with surrounding whitespace removed
+    """
+    buffer = getattr(sys.stdin, "buffer", None)
+    if buffer is None:
+        return sys.stdin.read().strip()
+
+    encoding = sys.stdin.encoding or "utf-8"
+    return buffer.read().decode(encoding, errors="replace").strip()
+
+
+@lru_cache(maxsize=1)
+def _prompt_file() -> str:
+    """
+    Get the temp file used for editor input.
+
+    Created once per process and reused by every edit; removed at exit.
+    """
+    fd, path = tempfile.mkstemp(prefix=f"deepshell-prompt-{os.getpid()}-", suffix=".txt")
+    os.close(fd)
+    atexit.register(_remove_file, path)
+    return path
+
+
+def _remove_file(path: str) -> None:
+    """Remove a file, ignoring errors."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
 def get_edited_prompt() -> str:
     """
     Open user's preferred editor for prompt input.
@@ -38,11 +80,12 @@ def get_edited_prompt() -> str:
         Content from editor
     """
     editor = os.getenv("EDITOR", "nano")
-
-    with tempfile.NamedTemporaryFile(mode="w+", suffix=".txt", delete=False) as f:
-        temp_file = f.name
+    temp_file = _prompt_file()
 
     try:
+        # Start from an empty file
+        open(temp_file, "w").close()
+
         # Open editor
         subprocess.run([editor, temp_file], check=True)
 
@@ -60,12 +103,24 @@ def get_edited_prompt() -> str:
         console.print(f"[red]Error: Editor '{editor}' not found[/red]")
         return ""
 
-    finally:
-        # Clean up temp file
-        try:
-            os.unlink(temp_file)
-        except OSError:
-            pass
+
+@lru_cache(maxsize=1)
+def _bash_lexer():
+    """Get the Pygments bash lexer, loading it on first use."""
+    from pygments.lexers.shell import BashLexer
+    return BashLexer()
+
+
+@lru_cache(maxsize=8)
+def _command_syntax(command: str):
+    """
+    Build the highlighted command panel.
+
+    Cached so that re-prompting for the same command (after describing it,
+    or a modify that left it unchanged) reuses the panel.
+    """
+    from rich.syntax import Syntax
+    return Syntax(command, _bash_lexer(), theme="monokai", line_numbers=False)
 
 
 def run_shell_command(command: str, interactive: bool = False) -> Optional[str]:
@@ -79,13 +134,14 @@ def run_shell_command(command: str, interactive: bool = False) -> Optional[str]:
     Returns:
         Command output if successful, None otherwise
     """
+    from rich.prompt import Prompt
+
     if not command.strip():
         return None
 
     # Display command with syntax highlighting
-    syntax = Syntax(command, "bash", theme="monokai", line_numbers=False)
     console.print("\n[bold]Generated Command:[/bold]")
-    console.print(syntax)
+    console.print(_command_syntax(command))
 
     if interactive:
         # Interactive confirmation
@@ -228,22 +284,51 @@ bindkey -s '^G' 'ds_suggest '
         console.print(f"[red]Error installing shell integration: {e}[/red]")
 
 
-def detect_shell() -> str:
+@lru_cache(maxsize=1)
+def read_os_release() -> Optional[str]:
     """
-    Detect current shell.
+    Read the distribution name from /etc/os-release.
+
+    The file does not change while DeepShell runs, so it is read once.
 
     Returns:
-        Shell name (bash, zsh, fish, etc.)
+        PRETTY_NAME value, or None if unavailable
     """
-    # Try environment variable first
-    shell = os.getenv("SHELL", "")
-    if shell:
-        return os.path.basename(shell)
+    try:
+        data = "\n" + Path("/etc/os-release").read_text()
+    except OSError:
+        return None
+
+    start = data.find("\nPRETTY_NAME=")
+    if start == -1:
+        return None
+    start += len("\nPRETTY_NAME=")
+    end = data.find("\n", start)
+    return data[start:end if end != -1 else None].strip().strip('"')
+
+
+@lru_cache(maxsize=1)
+def parent_process_name(ppid: int) -> Optional[str]:
+    """
+    Get the command name of a process, cached per process id.
+
+    Reads /proc/<pid>/comm where procfs exists (Linux) and only runs ps
+    elsewhere.
+
+    Args:
+        ppid: Process id to look up
+
+    Returns:
+        Command name, or None if it cannot be determined
+    """
+    try:
+        return Path(f"/proc/{ppid}/comm").read_text().strip()
+    except OSError:
+        pass
 
-    # Try parent process detection
     try:
         result = subprocess.run(
-            ["ps", "-p", str(os.getppid()), "-o", "comm="],
+            ["ps", "-p", str(ppid), "-o", "comm="],
             capture_output=True,
             text=True,
             timeout=2
@@ -252,11 +337,26 @@ def detect_shell() -> str:
             return result.stdout.strip()
     except (subprocess.TimeoutExpired, FileNotFoundError):
         pass
+    return None
 
-    # Default fallback
-    return "bash"
 
+def detect_shell() -> str:
+    """
+    Detect current shell.
 
+    Returns:
+        Shell name (bash, zsh, fish, etc.)
+    """
+    # Try environment variable first
+    shell = os.getenv("SHELL", "")
+    if shell:
+        return os.path.basename(shell)
+
+    # Try parent process detection
+    return parent_process_name(os.getppid()) or "bash"
+
+
+@lru_cache(maxsize=1)
 def detect_os() -> str:
     """
     Detect operating system with detailed information.
@@ -271,17 +371,8 @@ def detect_os() -> str:
         return f"macOS {version}"
 
     elif system == "Linux":
-        try:
-            # Try to get distribution info
-            with open("/etc/os-release", "r") as f:
-                for line in f:
-                    if line.startswith("PRETTY_NAME="):
-                        return line.split("=", 1)[1].strip().strip('"')
-        except FileNotFoundError:
-            pass
-
-        # Fallback to generic Linux
-        return f"Linux {platform.release()}"
+        # Fall back to generic Linux without distribution info
+        return read_os_release() or f"Linux {platform.release()}"
 
     elif system == "Windows":
         version = platform.version()
@@ -291,6 +382,9 @@ def detect_os() -> str:
         return f"{system} {platform.release()}"
 
 
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
+
+
 def format_file_size(size_bytes: int) -> str:
     """
     Format file size in human-readable format.
@@ -301,11 +395,9 @@ def format_file_size(size_bytes: int) -> str:
     Returns:
         Formatted size string
     """
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.1f} PB"
+    # Every 10 bits of magnitude is one unit step
+    i = min(max(int(size_bytes).bit_length() - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (i * 10)):.1f} {_SIZE_UNITS[i]}"
 
 
 def truncate_text(text: str, max_length: int = 100) -> str:
@@ -334,18 +426,19 @@ def validate_api_key(api_key: str) -> bool:
     Returns:
         True if format appears valid
     """
-    if not api_key:
-        return False
+    return bool(api_key) and _API_KEY_RE.fullmatch(api_key) is not None
 
-    # OpenAI API keys typically start with 'sk-'
-    if not api_key.startswith("sk-"):
-        return False
 
-    # Should be reasonably long
-    if len(api_key) < 20:
-        return False
-
-    return True
+@lru_cache(maxsize=1)
+def _platform_info() -> Dict[str, str]:
+    """Platform details that cannot change while the process runs."""
+    return {
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        # Pointer size of this interpreter; platform.architecture() may run `file`
+        "architecture": f"{struct.calcsize('P') * 8}bit",
+        "processor": platform.processor() or "Unknown",
+    }
 
 
 def get_system_info() -> dict:
@@ -358,10 +451,7 @@ def get_system_info() -> dict:
     return {
         "os": detect_os(),
         "shell": detect_shell(),
-        "python_version": platform.python_version(),
-        "platform": platform.platform(),
-        "architecture": platform.architecture()[0],
-        "processor": platform.processor() or "Unknown",
+        **_platform_info(),
         "user": os.getenv("USER", os.getenv("USERNAME", "Unknown")),
         "home": str(Path.home()),
         "cwd": str(Path.cwd()),
@@ -0,0 +1,43 @@
+"""Keyword lists used by the /run-agent request filter in wrapper.py."""
+
+# ✅ Primary allowed keywords (broad DevOps/infra domain)
+ALLOWED_KEYWORDS = (
+    "linux", "bash", "shell", "command", "script", "terminal", "cli",
+    "devops", "docker", "kubernetes", "k8s", "container", "pod",
+    "cloud", "aws", "azure", "gcp", "ec2", "s3", "lambda",
+    "ansible", "terraform", "iac", "playbook", "manifest",
+    "infrastructure", "sysadmin", "server", "vm", "instance",
+    "ci", "cd", "pipeline", "build", "deploy", "deployment",
+    "jenkins", "gitlab", "github actions", "circleci", "travis",
+    "helm", "istio", "rancher", "openshift", "kubectl",
+    "vagrant", "packer", "consul", "vault", "nomad",
+    "nginx", "apache", "haproxy", "firewall", "iptables", "ufw",
+    "ssl", "tls", "certificate", "https", "security",
+    "mysql", "postgresql", "mongodb", "redis", "database", "db",
+    "git", "svn", "version control", "repository", "commit",
+    "monitoring", "logging", "prometheus", "grafana", "elk",
+    "network", "dns", "load balancer", "proxy", "vpn",
+    "backup", "restore", "snapshot", "volume", "storage",
+    "systemd", "service", "daemon", "cron", "systemctl",
+    "package", "yum", "apt", "rpm", "dpkg", "install",
+    "lvm", "filesystem", "mount", "disk", "partition"
+)
+
+# ✅ Chef/Puppet require context keywords
+CHEF_TERMS = ("chef recipe", "chef cookbook", "chef resource", "chef file", "chef node")
+PUPPET_TERMS = ("puppet manifest", "puppet module", "puppet class", "puppet agent")
+
+# ✅ Excluded obvious non-tech words / traps
+EXCLUDED_CONTEXT = (
+    "food", "cooking", "kitchen", "biryani", "chicken", "mutton", "pasta", "recipe",
+    "oil pipeline", "business", "finance", "company fraud", "movie", "song", "music",
+    "love", "poem", "poetry", "story", "novel", "romance", "dating", "fluffy", "favorite",
+    "tree", "coffee", "startup", "pitch", "bitcoin", "crypto", "trading", "stock",
+    "game", "sports", "football", "cricket", "entertainment", "joke", "meme", "funny",
+    "health", "medicine", "doctor", "hospital", "treatment",
+    "travel", "vacation", "holiday", "tourism", "hotel"
+)
+
+# 🚫 Block trivia style Q&A unless tied to actionable context
+QUESTION_WORDS = ("who", "what", "when", "where", "why", "how many")
+TASK_TERMS = ("script", "command", "yaml", "playbook", "manifest", "dockerfile")
@@ -12,6 +12,8 @@ setup(
         "prompt-toolkit>=3.0.0",
         "pydantic>=2.0.0",
         "click>=8.0.0",
+        "orjson>=3.9.0",
+        "zstandard>=0.21.0",
     ],
     entry_points={
         "console_scripts": [
@@ -1,12 +1,171 @@
+import asyncio
+import io
+import json
 import os
-import subprocess
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, redirect_stdout
+from functools import lru_cache
+from itertools import islice
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 
-app = FastAPI()
+from keywords import (
+    ALLOWED_KEYWORDS,
+    CHEF_TERMS,
+    EXCLUDED_CONTEXT,
+    PUPPET_TERMS,
+    QUESTION_WORDS,
+    TASK_TERMS,
+)
+
+try:
+    import ahocorasick
+except ImportError:  # optional speedup, falls back to a compiled regex
+    ahocorasick = None
+
+# "inprocess" runs deepshell inside this server, "pool" hands prompts to
+# pre-started worker processes, "subprocess" spawns a CLI per request
+DEEPSHELL_RUNNER = os.getenv("DEEPSHELL_RUNNER", "inprocess")
+# Pool size per server process; every uvicorn worker (WEB_CONCURRENCY)
+# starts its own pool, so the total is WEB_CONCURRENCY x DEEPSHELL_WORKERS
+DEEPSHELL_WORKERS = int(os.getenv("DEEPSHELL_WORKERS", "2"))
+# Longer prompts are refused with 413 before any filtering
+MAX_PROMPT_LENGTH = int(os.getenv("DEEPSHELL_MAX_PROMPT_LENGTH", "4096"))
+# Request bodies past this are refused unread; JSON escaping can take up
+# to 12 bytes per character
+MAX_BODY_SIZE = 12 * MAX_PROMPT_LENGTH + 1024
+# Seconds a pool or subprocess run may take before it is killed
+DEEPSHELL_TIMEOUT = float(os.getenv("DEEPSHELL_TIMEOUT", "120"))
+
+# Environment passed to deepshell processes: the basics, proxy and TLS
+# settings, and every setting deepshell/config.py reads from the environment
+DEEPSHELL_ENV_NAMES = frozenset((
+    "PATH", "HOME", "USER", "SHELL", "LANG", "TERM", "TMPDIR", "PYTHONPATH", "VIRTUAL_ENV",
+    "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "no_proxy",
+    "SSL_CERT_FILE", "SSL_CERT_DIR", "REQUESTS_CA_BUNDLE",
+    "PROVIDER", "OPENAI_API_KEY", "DEFAULT_MODEL", "API_BASE_URL", "USE_LITELLM",
+    "REQUEST_TIMEOUT", "PROMPT_CACHE", "CHAT_CACHE_PATH", "CACHE_PATH",
+    "CHAT_CACHE_LENGTH", "CACHE_LENGTH", "HOT_CACHE_LENGTH", "ENABLE_CACHE",
+    "CACHE_BACKEND", "REPL_HISTORY_PATH", "PRETTIFY_MARKDOWN", "DEFAULT_COLOR",
+    "CODE_THEME", "DISABLE_STREAMING", "PERSONA_STORAGE_PATH", "DEFAULT_PERSONA",
+    "FUNCTIONS_PATH", "USE_FUNCTIONS", "SHOW_FUNCTIONS_OUTPUT", "SHELL_INTERACTION",
+    "DEFAULT_EXECUTE_SHELL_CMD", "OS_NAME", "SHELL_NAME", "MAX_RETRIES",
+    "RETRY_DELAY", "MAX_CONCURRENCY", "LOG_LEVEL",
+))
+DEEPSHELL_ENV_PREFIXES = ("LC_", "OPENAI_", "LITELLM_", "DEEPSHELL_")
+# Snapshotted once instead of copying os.environ for every spawn
+DEEPSHELL_ENV = {
+    name: value
+    for name, value in os.environ.items()
+    if name in DEEPSHELL_ENV_NAMES or name.startswith(DEEPSHELL_ENV_PREFIXES)
+}
+
+# Recent answers by prompt, so repeated questions skip deepshell entirely
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = float(os.getenv("DEEPSHELL_CACHE_TTL", "3600"))
+response_cache = OrderedDict()  # prompt -> (expires_at, output)
+
+deepshell_cli = None
+
+def import_deepshell():
+    """Import the deepshell CLI once, so runs skip interpreter startup and imports."""
+    global deepshell_cli, deepshell_console
+    saved_stdin = sys.stdin
+    try:
+        # Loading the config must not stop to ask for an API key
+        with open(os.devnull) as devnull:
+            sys.stdin = devnull
+            from deepshell._console import console as deepshell_console
+            from deepshell.cli import app as deepshell_cli
+    except Exception:
+        # Not installed or failed to load; requests fall back to a subprocess
+        deepshell_cli = None
+    finally:
+        sys.stdin = saved_stdin
+
+if DEEPSHELL_RUNNER == "inprocess":
+    import_deepshell()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Start pool workers before the first request and stop them on shutdown
+    if worker_pool is not None:
+        await worker_pool.start()
+    yield
+    if worker_pool is not None:
+        await worker_pool.close()
+
+TOO_LONG_DETAIL = f"Prompt is too long (limit is {MAX_PROMPT_LENGTH} characters)"
+TOO_LONG_BODY = json.dumps({"detail": TOO_LONG_DETAIL}).encode()
+
+def too_long_response():
+    return Response(content=TOO_LONG_BODY, status_code=413, media_type="application/json")
+
+class PromptFilterMiddleware:
+    """Reject filtered /run-agent prompts before routing and body validation.
+
+    Plain ASGI rather than BaseHTTPMiddleware, so other requests pass
+    straight through. The buffered body is replayed for allowed prompts.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != "/run-agent":
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return  # client disconnected
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if size > MAX_BODY_SIZE:
+                await too_long_response()(scope, receive, send)
+                return
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        try:
+            prompt = json.loads(body)["prompt"]
+        except (ValueError, KeyError, TypeError):
+            # Malformed requests go on to get FastAPI's validation error
+            prompt = None
+        if isinstance(prompt, str) and len(prompt) > MAX_PROMPT_LENGTH:
+            await too_long_response()(scope, receive, send)
+            return
+        if isinstance(prompt, str) and not is_allowed_query(prompt):
+            await Response(content=REJECT_BODY, media_type="application/json")(scope, receive, send)
+            return
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
+
+app = FastAPI(lifespan=lifespan)
+
+# Added before CORS so rejections still get CORS headers
+app.add_middleware(PromptFilterMiddleware)
 
 # CORS setup (adjust origins as needed)
 app.add_middleware(
@@ -23,115 +182,305 @@ ui_path = os.path.join(os.path.dirname(__file__), '..')
 # Serve static files (JS, CSS, etc.) under /static
 app.mount("/static", StaticFiles(directory=ui_path), name="static")
 
-# Serve index.html on root
+# Serve index.html on root, read once instead of opened per request
+with open(os.path.join(ui_path, "index.html"), "rb") as f:
+    INDEX_HTML = f.read()
+
 @app.get("/")
 async def root():
-    return FileResponse(os.path.join(ui_path, "index.html"))
+    return Response(content=INDEX_HTML, media_type="text/html")
 
 class AgentRequest(BaseModel):
     prompt: str
 
-# ✅ Primary allowed keywords (broad DevOps/infra domain)
-ALLOWED_KEYWORDS = [
-    "linux", "bash", "shell", "command", "script", "terminal", "cli",
-    "devops", "docker", "kubernetes", "k8s", "container", "pod",
-    "cloud", "aws", "azure", "gcp", "ec2", "s3", "lambda",
-    "ansible", "terraform", "iac", "playbook", "manifest",
-    "infrastructure", "sysadmin", "server", "vm", "instance",
-    "ci", "cd", "pipeline", "build", "deploy", "deployment",
-    "jenkins", "gitlab", "github actions", "circleci", "travis",
-    "helm", "istio", "rancher", "openshift", "kubectl",
-    "vagrant", "packer", "consul", "vault", "nomad",
-    "nginx", "apache", "haproxy", "firewall", "iptables", "ufw",
-    "ssl", "tls", "certificate", "https", "security",
-    "mysql", "postgresql", "mongodb", "redis", "database", "db",
-    "git", "svn", "version control", "repository", "commit",
-    "monitoring", "logging", "prometheus", "grafana", "elk",
-    "network", "dns", "load balancer", "proxy", "vpn",
-    "backup", "restore", "snapshot", "volume", "storage",
-    "systemd", "service", "daemon", "cron", "systemctl",
-    "package", "yum", "apt", "rpm", "dpkg", "install",
-    "lvm", "filesystem", "mount", "disk", "partition"
-]
-
-# ✅ Chef/Puppet require context keywords
-CHEF_TERMS = ["chef recipe", "chef cookbook", "chef resource", "chef file", "chef node"]
-PUPPET_TERMS = ["puppet manifest", "puppet module", "puppet class", "puppet agent"]
-
-# ✅ Excluded obvious non-tech words / traps
-EXCLUDED_CONTEXT = [
-    "food", "cooking", "kitchen", "biryani", "chicken", "mutton", "pasta", "recipe",
-    "oil pipeline", "business", "finance", "company fraud", "movie", "song", "music",
-    "love", "poem", "poetry", "story", "novel", "romance", "dating", "fluffy", "favorite",
-    "tree", "coffee", "startup", "pitch", "bitcoin", "crypto", "trading", "stock",
-    "game", "sports", "football", "cricket", "entertainment", "joke", "meme", "funny",
-    "health", "medicine", "doctor", "hospital", "treatment",
-    "travel", "vacation", "holiday", "tourism", "hotel"
-]
-
-# 🚫 Block trivia style Q&A unless tied to actionable context
-QUESTION_WORDS = ["who", "what", "when", "where", "why", "how many"]
+# Declared so FastAPI serializes responses straight to JSON bytes with pydantic
+class AgentResponse(BaseModel):
+    output: str
+
+def build_matcher(terms):
+    """Return a function telling whether a string contains any of terms.
 
+    Uses one Aho-Corasick automaton (or a single alternation regex without
+    pyahocorasick), so a check is one pass over the string however many
+    terms there are. Building one takes tens of microseconds for these
+    lists, so the automatons are built at import rather than shipped
+    precomputed.
+    """
+    if ahocorasick is None:
+        pattern = re.compile("|".join(map(re.escape, terms)))
+        return lambda text: pattern.search(text) is not None
+
+    automaton = ahocorasick.Automaton()
+    for term in terms:
+        automaton.add_word(term, term)
+    automaton.make_automaton()
+    return lambda text: next(automaton.iter(text), None) is not None
+
+has_excluded_term = build_matcher(EXCLUDED_CONTEXT)
+has_task_term = build_matcher(TASK_TERMS)
+has_context_term = build_matcher(CHEF_TERMS + PUPPET_TERMS)
+has_allowed_keyword = build_matcher(ALLOWED_KEYWORDS)
+
+# Whole-word keywords, checked by set lookup before any substring search
+ALLOWED_WORDS = frozenset(kw for kw in ALLOWED_KEYWORDS if " " not in kw)
+WORD_RE = re.compile(r"[a-z0-9_]+")
+
+@lru_cache(maxsize=2048)
 def is_allowed_query(query: str) -> bool:
+    # Bound the work before touching the text
+    if not query or len(query) > MAX_PROMPT_LENGTH:
+        return False
+
+    # str.lower() has its own ASCII fast path; byte-level translate was slower
     q = query.lower().strip()
 
-    # Block obvious nonsense
-    if any(bad in q for bad in EXCLUDED_CONTEXT):
-        return False
+    # Checks run cheapest first; both rejections apply before any acceptance
 
     # Block trivia style prompts
-    if any(q.startswith(word) for word in QUESTION_WORDS):
+    if q.startswith(QUESTION_WORDS):
         # Only allow if it's also a real infra task (script/command/etc.)
-        task_terms = ["script", "command", "yaml", "playbook", "manifest", "dockerfile"]
-        if not any(t in q for t in task_terms):
+        if not has_task_term(q):
             return False
 
+    # Block obvious nonsense
+    if has_excluded_term(q):
+        return False
+
     # Allow Chef/Puppet
-    if any(term in q for term in CHEF_TERMS + PUPPET_TERMS):
+    if has_context_term(q):
         return True
 
-    # Allow infra keywords
-    if any(kw in q for kw in ALLOWED_KEYWORDS):
+    # Allow infra keywords; a prompt word that is a keyword settles it
+    # without searching, otherwise fall back to substring matching
+    if not ALLOWED_WORDS.isdisjoint(WORD_RE.findall(q)) or has_allowed_keyword(q):
         return True
 
     # Default: reject
     return False
 
+FENCE_RE = re.compile(r"```(?:[\w+-]+\n)?(.*?)(?:```|\Z)", re.DOTALL)
+NONSPACE_RE = re.compile(r"\S+")
+
+@lru_cache(maxsize=1024)
 def clean_output(raw: str) -> str:
-    raw = raw.strip()
-    if not raw:
+    if not raw or raw.isspace():
         return "No output from deepshell CLI."
 
-    if "```" in raw:
-        parts = raw.split("```")
-        if len(parts) >= 2:
-            code = parts[1].strip()
-            return f"```bash\n{code}\n```"
+    # First fenced block, without its language tag; an unclosed fence runs to the end
+    match = FENCE_RE.search(raw)
+    if match:
+        return f"```bash\n{match.group(1).strip()}\n```"
 
-    if "\n" in raw or len(raw.split()) <= 8:
+    # Only copied once it is known there is no fenced block to extract
+    raw = raw.strip()
+
+    # Count words only up to nine, without slicing out any of the text
+    if "\n" in raw or sum(1 for _ in islice(NONSPACE_RE.finditer(raw), 9)) <= 8:
         return f"```bash\n{raw}\n```"
 
     return raw
 
-@app.post("/run-agent")
+# deepshell prints through one process-wide console, so in-process runs
+# take turns capturing it
+deepshell_lock = threading.Lock()
+
+def run_deepshell_inprocess(prompt: str):
+    """Run the deepshell CLI in this process and return (exit_code, output)."""
+    from rich.text import Text
+
+    saved_stdin = sys.stdin
+    # Plain prints (e.g. from user functions) bypass the console capture
+    stray = io.StringIO()
+    with deepshell_lock, open(os.devnull) as devnull:
+        # Nothing is piped to the CLI; don't let it read the server's stdin
+        sys.stdin = devnull
+        try:
+            with redirect_stdout(stray), deepshell_console.capture() as capture:
+                exit_code = deepshell_cli(
+                    ["--no-stream", "--", prompt],
+                    prog_name="deepshell",
+                    standalone_mode=False,
+                )
+        except SystemExit as e:
+            exit_code = e.code
+        finally:
+            sys.stdin = saved_stdin
+
+    # Drop any terminal styling the console was set up with
+    output = Text.from_ansi(stray.getvalue() + capture.get()).plain
+    return exit_code if isinstance(exit_code, int) else 0, output
+
+def serve_worker():
+    """Pool worker: answer JSON-line prompts on stdin until it is closed."""
+    import_deepshell()
+    # Frames go to the real stdout; anything else printed goes to stderr
+    frames = sys.stdout
+    sys.stdout = sys.stderr
+    for line in sys.stdin:
+        if deepshell_cli is None:
+            exit_code, output = 1, "deepshell is not installed"
+        else:
+            exit_code, output = run_deepshell_inprocess(json.loads(line)["prompt"])
+        frames.write(json.dumps({"exit_code": exit_code, "output": output}) + "\n")
+        frames.flush()
+
+class WorkerPool:
+    """Worker processes started ahead of requests, each already past its imports."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.idle = None
+        # Every live worker, idle or busy, so close() can stop them all
+        self.workers = set()
+        self.closed = False
+
+    async def start(self):
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            self.idle.put_nowait(await self.spawn())
+
+    async def spawn(self):
+        worker = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env=DEEPSHELL_ENV,
+            limit=2 ** 24,
+        )
+        self.workers.add(worker)
+        return worker
+
+    async def run(self, prompt: str):
+        """Send a prompt to an idle worker and return (exit_code, output)."""
+        worker = await self.idle.get()
+        try:
+            worker.stdin.write((json.dumps({"prompt": prompt}) + "\n").encode())
+            await worker.stdin.drain()
+            frame = await asyncio.wait_for(worker.stdout.readline(), DEEPSHELL_TIMEOUT)
+        except (BrokenPipeError, ConnectionResetError):
+            frame = b""
+        except BaseException:
+            # Timed out or cancelled: its reply would reach the next caller
+            asyncio.ensure_future(self.replace(worker))
+            raise
+
+        if not frame:
+            await self.replace(worker)
+            return 1, "deepshell worker exited unexpectedly"
+
+        self.idle.put_nowait(worker)
+        result = json.loads(frame)
+        return result["exit_code"], result["output"]
+
+    async def replace(self, worker):
+        """Reap a worker that can't be reused and start a fresh one in its place."""
+        await self.reap(worker)
+        if not self.closed:
+            self.idle.put_nowait(await self.spawn())
+
+    async def reap(self, worker):
+        """Kill a worker if it is still running and wait for it to exit."""
+        self.workers.discard(worker)
+        if worker.returncode is None:
+            try:
+                worker.kill()
+            except ProcessLookupError:
+                pass
+        await worker.wait()
+
+    async def close(self):
+        """Stop all workers: idle ones at the end of their input, busy ones by force."""
+        self.closed = True
+        while not self.idle.empty():
+            worker = self.idle.get_nowait()
+            self.workers.discard(worker)
+            worker.stdin.close()
+            await worker.wait()
+        await asyncio.gather(*(self.reap(worker) for worker in list(self.workers)))
+
+worker_pool = WorkerPool(DEEPSHELL_WORKERS) if DEEPSHELL_RUNNER == "pool" else None
+
+# Rejection body, serialized once. A fresh Response wraps it per request, since
+# middleware may add headers to the response it is given
+REJECT_BODY = AgentResponse(
+    output="⚠️ Deepshell is specialized for Linux, Infra, DevOps, Cloud, and IaC tasks only. General Q&A is not supported here."
+).model_dump_json().encode()
+
+async def run_deepshell_subprocess(prompt: str):
+    """Run the deepshell CLI in a new process and return (exit_code, output)."""
+    # The CLI takes piped stdin as the prompt, which avoids argv size limits
+    proc = await asyncio.create_subprocess_exec(
+        "python3", "-m", "deepshell",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=DEEPSHELL_ENV,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(prompt.encode()), DEEPSHELL_TIMEOUT)
+    except BaseException:
+        # Timed out or the request was cancelled; don't leave it running
+        proc.kill()
+        await proc.wait()
+        raise
+    stdout = stdout.decode(errors="replace")
+    if proc.returncode != 0:
+        # Report stderr when there is any, as the CLI prints errors there
+        return proc.returncode, stderr.decode(errors="replace").strip() or stdout
+    return 0, stdout
+
+@app.post("/run-agent", response_model=AgentResponse)
 async def run_agent(request: AgentRequest):
+    # Normally already rejected by PromptFilterMiddleware; these are cheap
+    if len(request.prompt) > MAX_PROMPT_LENGTH:
+        raise HTTPException(status_code=413, detail=TOO_LONG_DETAIL)
     if not is_allowed_query(request.prompt):
-        return {"output": "⚠️ Deepshell is specialized for Linux, Infra, DevOps, Cloud, and IaC tasks only. General Q&A is not supported here."}
+        return Response(content=REJECT_BODY, media_type="application/json")
+
+    cached = response_cache.get(request.prompt)
+    if cached is not None and cached[0] > time.monotonic():
+        response_cache.move_to_end(request.prompt)
+        return {"output": cached[1]}
 
     try:
-        result = subprocess.run(
-            ["python3", "-m", "deepshell", request.prompt],
-            capture_output=True,
-            text=True,
-            check=True,
-            env=os.environ
-        )
-        cleaned = clean_output(result.stdout)
-        return {"output": cleaned}
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr.strip() or e.stdout.strip() or "Unknown error"
-        raise HTTPException(status_code=500, detail=error_msg)
+        if worker_pool is not None:
+            exit_code, output = await worker_pool.run(request.prompt)
+        elif deepshell_cli is not None:
+            exit_code, output = await run_in_threadpool(run_deepshell_inprocess, request.prompt)
+        else:
+            exit_code, output = await run_deepshell_subprocess(request.prompt)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="deepshell timed out")
+
+    if exit_code != 0:
+        raise HTTPException(status_code=500, detail=output.strip() or "Unknown error")
+
+    # deepshell exits non-zero on any failure, so only answers get here
+    cleaned = clean_output(output)
+    response_cache[request.prompt] = (time.monotonic() + RESPONSE_CACHE_TTL, cleaned)
+    response_cache.move_to_end(request.prompt)
+    if len(response_cache) > RESPONSE_CACHE_SIZE:
+        response_cache.popitem(last=False)
+    return {"output": cleaned}
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ["--worker"]:
+        serve_worker()
+        sys.exit()
+
     import uvicorn
-    uvicorn.run("wrapper:app", host="0.0.0.0", port=8001, reload=True)
+
+    # Auto-reload is for development only and runs a single worker.
+    # WEB_CONCURRENCY is uvicorn's own setting for server processes; with
+    # DEEPSHELL_RUNNER=pool each one also runs DEEPSHELL_WORKERS workers
+    debug = os.getenv("DEEPSHELL_DEBUG", "false").lower() == "true"
+    uvicorn.run(
+        "wrapper:app",
+        host="0.0.0.0",
+        port=8001,
+        reload=debug,
+        workers=None if debug else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 2)),
+        # uvloop and httptools when installed (uvicorn[standard])
+        loop="auto",
+        http="auto",
+    )